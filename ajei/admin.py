@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import ContactSubmission, PageView
+from .models import ContactSubmission, DailyConversion, DailyDownload, PageView
 
 
 @admin.register(ContactSubmission)
@@ -24,6 +24,7 @@ class ContactSubmissionAdmin(admin.ModelAdmin):
     list_filter = [
         "status",
         "investment_type",
+        "utm_campaign",
         "created_at",
         "contacted_at",
     ]
@@ -42,6 +43,14 @@ class ContactSubmissionAdmin(admin.ModelAdmin):
         "ip_address",
         "user_agent",
         "referrer",
+        "session_key",
+        "landing_path",
+        "landing_language",
+        "landing_referrer",
+        "landed_at",
+        "utm_source",
+        "utm_medium",
+        "utm_campaign",
     ]
 
     fieldsets = (
@@ -58,6 +67,22 @@ class ContactSubmissionAdmin(admin.ModelAdmin):
                 "classes": ("collapse",),
             },
         ),
+        (
+            _("Landing"),
+            {
+                "fields": (
+                    "landing_path",
+                    "landing_language",
+                    "landing_referrer",
+                    "landed_at",
+                    "session_key",
+                    "utm_source",
+                    "utm_medium",
+                    "utm_campaign",
+                ),
+                "classes": ("collapse",),
+            },
+        ),
         (
             _("Timestamps"),
             {"fields": ("created_at", "updated_at"), "classes": ("collapse",)},
@@ -160,13 +185,16 @@ class PageViewAdmin(admin.ModelAdmin):
         "page_path",
         "language",
         "ip_address",
+        "is_bot",
         "viewed_at",
     ]
 
     list_filter = [
         "language",
+        "is_bot",
         "viewed_at",
         "page_path",
+        "utm_campaign",
     ]
 
     search_fields = [
@@ -181,8 +209,15 @@ class PageViewAdmin(admin.ModelAdmin):
         "ip_address",
         "user_agent",
         "referrer",
+        "referrer_host",
+        "utm_source",
+        "utm_medium",
+        "utm_campaign",
         "session_key",
         "language",
+        "is_bot",
+        "is_landing",
+        "sample_weight",
         "viewed_at",
     ]
 
@@ -195,3 +230,61 @@ class PageViewAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """Make page views read-only"""
         return False
+
+
+@admin.register(DailyConversion)
+class DailyConversionAdmin(admin.ModelAdmin):
+    """
+    Admin interface for browsing the daily funnel rollup
+    """
+
+    list_display = [
+        "date",
+        "landing_path",
+        "language",
+        "referrer_host",
+        "utm_campaign",
+        "visitors",
+        "submissions",
+    ]
+
+    list_filter = [
+        "language",
+        "landing_path",
+        "utm_campaign",
+        "date",
+    ]
+
+    search_fields = [
+        "landing_path",
+        "referrer_host",
+    ]
+
+    date_hierarchy = "date"
+
+    def has_add_permission(self, request):
+        """Rows are maintained by the funnel"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Make the rollup read-only"""
+        return False
+
+
+@admin.register(DailyDownload)
+class DailyDownloadAdmin(admin.ModelAdmin):
+    """
+    Admin interface for browsing download counts
+    """
+
+    list_display = ["date", "file", "downloads"]
+    list_filter = ["file", "date"]
+    date_hierarchy = "date"
+
+    def has_add_permission(self, request):
+        """Rows are maintained by the download view"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Make the counts read-only"""
+        return False
@@ -0,0 +1,78 @@
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+
+
+Attribution = namedtuple("Attribution", "referrer_host source medium campaign")
+
+UTM_FIELDS = ("utm_source", "utm_medium", "utm_campaign")
+
+NO_ATTRIBUTION = Attribution("", "", "", "")
+
+
+def _campaign_params(query_string):
+    """
+    Raw UTM source, medium and campaign of a query string, and whether it
+    has a Google Ads click id (None when it has neither: no parsing)
+    """
+    if "utm_" not in query_string and "gclid" not in query_string:
+        return None
+    params = parse_qs(query_string)
+    return (*(params.get(name, [""])[0] for name in UTM_FIELDS), "gclid" in params)
+
+
+def _utm(params):
+    if params is None:
+        return ["", "", ""]
+    *values, gclid = params
+    utm = [value.strip().lower()[:100] for value in values]
+    if not any(utm) and gclid:
+        # Google Ads auto-tagging adds a click id instead of UTM parameters
+        utm = ["google", "cpc", ""]
+    return utm
+
+
+def attribution(query_string, referrer):
+    """
+    Referrer host (without "www.") and UTM source, medium and campaign of a
+    visit. The UTM parameters of the landing URL win over those of the
+    referrer URL.
+    """
+    if not query_string and not referrer:
+        return NO_ATTRIBUTION
+    try:
+        parts = urlsplit(referrer) if referrer else None
+    except ValueError:
+        parts = None
+    host = parts.hostname or "" if parts else ""
+    return _attribution(
+        host,
+        _campaign_params(query_string),
+        _campaign_params(parts.query) if parts else None,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _attribution(host, landing_params, referrer_params):
+    # Cached on the extracted values, not the raw query strings: every ad
+    # click carries a unique click id (gclid, fbclid) that would make each
+    # visit a miss and push the organic entries out
+    if host.startswith("www."):
+        host = host[4:]
+    utm = _utm(landing_params)
+    if not any(utm):
+        utm = _utm(referrer_params)
+    return Attribution(host, *utm)
+
+
+def referrer_host(referrer):
+    """Host name of a referrer URL, without "www." ("" if there is none)"""
+    return attribution("", referrer).referrer_host
+
+
+def cache_info():
+    return _attribution.cache_info()
+
+
+def cache_clear():
+    _attribution.cache_clear()
@@ -0,0 +1,116 @@
+import re
+from functools import lru_cache
+
+
+# Category -> user-agent tokens. Order matters: the first group that matches
+# wins, so the more specific categories come before the generic crawler one.
+BOT_PATTERNS = {
+    "preview": [
+        "facebookexternalhit",
+        "facebookcatalog",
+        "whatsapp",
+        "telegrambot",
+        "twitterbot",
+        "linkedinbot",
+        "slackbot",
+        "slack-imgproxy",
+        "discordbot",
+        "skypeuripreview",
+        "pinterest",
+        "embedly",
+        "vkshare",
+    ],
+    "monitor": [
+        "uptimerobot",
+        "pingdom",
+        "statuscake",
+        "site24x7",
+        "betteruptime",
+        "newrelicpinger",
+        "datadog",
+        "kube-probe",
+        "prometheus",
+        "elb-healthchecker",
+        "googlehc",
+        "healthcheck",
+        "monitor",
+    ],
+    "tool": [
+        "curl/",
+        "wget/",
+        "python-requests",
+        "python-urllib",
+        "aiohttp",
+        "httpx",
+        "go-http-client",
+        "okhttp",
+        "java/",
+        "libwww-perl",
+        "headlesschrome",
+        "phantomjs",
+        "lighthouse",
+        "pagespeed",
+        "gtmetrix",
+    ],
+    "crawler": [
+        "bot",
+        "crawl",
+        "spider",
+        "slurp",
+        "mediapartners-google",
+        "adsbot",
+        "bingpreview",
+        "yandex",
+        "baidu",
+        "duckduckgo",
+        "petalsearch",
+        "archive.org",
+        "feedfetcher",
+    ],
+}
+
+# One alternation with a named group per category, compiled once at import.
+# Tokens are lowercase and matched against the lowercased user agent, which is
+# far cheaper than an IGNORECASE pattern over the same alternation.
+_BOT_RE = re.compile(
+    "|".join(
+        "(?P<{}>{})".format(category, "|".join(re.escape(t) for t in tokens))
+        for category, tokens in BOT_PATTERNS.items()
+    )
+)
+
+# Only the first part of the user agent is used for matching and as the
+# cache key, which bounds the memory held by the LRU cache.
+MAX_USER_AGENT_LENGTH = 500
+
+
+@lru_cache(maxsize=4096)
+def _classify(user_agent):
+    if not user_agent:
+        # Real browsers always send a user agent
+        return "tool"
+    match = _BOT_RE.search(user_agent.lower())
+    return match.lastgroup if match else ""
+
+
+def classify_user_agent(user_agent):
+    """
+    Return the bot category ("preview", "monitor", "tool", "crawler") for a
+    user-agent string, or an empty string for a regular browser
+    """
+    return _classify((user_agent or "")[:MAX_USER_AGENT_LENGTH])
+
+
+def is_bot(user_agent):
+    """Return True if the user agent belongs to a crawler, probe or tool"""
+    return bool(classify_user_agent(user_agent))
+
+
+def cache_info():
+    """Expose the classifier cache statistics (used by the benchmarks)"""
+    return _classify.cache_info()
+
+
+def cache_clear():
+    """Reset the classifier cache"""
+    _classify.cache_clear()
@@ -0,0 +1,182 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+from django.utils import timezone
+
+from .funnel import count_landings
+from .geoip import lookup
+from .metrics import PAGEVIEW_BUFFER_DEPTH, PAGEVIEWS_DROPPED
+from .models import PageView
+
+
+logger = logging.getLogger(__name__)
+
+
+class PageViewBuffer:
+    """
+    Collect page views in memory and write them in batches from a
+    background thread, so a tracked request only appends to a list.
+
+    A batch is written when AJEI_PAGEVIEW_BUFFER_SIZE views are waiting,
+    otherwise every AJEI_PAGEVIEW_BUFFER_MAX_AGE seconds, and when the
+    process exits. Enrichment that doesn't need the request (GeoIP), and
+    counting the landings into the conversion rollup, happen here too. With
+    a size of 0 every view is written immediately by the request that
+    tracked it. ``viewed_at`` is the time of the view, not of the write.
+
+    A batch the database can't take right now is queued again; one failing
+    on a bad row is written row by row. At most AJEI_PAGEVIEW_BUFFER_MAX_ROWS
+    views wait: beyond that they are dropped and counted in
+    ajei_pageviews_dropped_total.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._rows = []
+        self._thread = None
+        self._pid = None
+
+    @property
+    def size(self):
+        return getattr(settings, "AJEI_PAGEVIEW_BUFFER_SIZE", 0)
+
+    @property
+    def max_age(self):
+        return getattr(settings, "AJEI_PAGEVIEW_BUFFER_MAX_AGE", 2.0)
+
+    @property
+    def max_rows(self):
+        return getattr(settings, "AJEI_PAGEVIEW_BUFFER_MAX_ROWS", 10000)
+
+    def add(self, **fields):
+        """Queue a page view, given as PageView field values"""
+        fields.setdefault("viewed_at", timezone.now())
+        if self.size <= 0:
+            self.write([fields])
+            return
+        with self._lock:
+            self._ensure_writer()
+            if len(self._rows) >= self.max_rows:
+                depth = None
+            else:
+                self._rows.append(fields)
+                depth = len(self._rows)
+        if depth is None:
+            # Writes are failing or stalled: don't grow without bound
+            PAGEVIEWS_DROPPED.inc(reason="overflow")
+            return
+        PAGEVIEW_BUFFER_DEPTH.set(depth)
+        if depth >= self.size:
+            self._wake.set()
+
+    def _requeue(self, rows):
+        """
+        Put rows that couldn't be written back in front of the queue, for
+        the next batch (as many as AJEI_PAGEVIEW_BUFFER_MAX_ROWS allows)
+        """
+        if self.size <= 0:
+            PAGEVIEWS_DROPPED.inc(len(rows), reason="error")
+            return
+        with self._lock:
+            kept = rows[: max(self.max_rows - len(self._rows), 0)]
+            self._rows[:0] = kept
+            depth = len(self._rows)
+        if len(rows) > len(kept):
+            PAGEVIEWS_DROPPED.inc(len(rows) - len(kept), reason="overflow")
+        PAGEVIEW_BUFFER_DEPTH.set(depth)
+
+    def _ensure_writer(self):
+        # Called with the lock held. After a fork the rows and the thread
+        # belong to the parent process.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._rows = []
+            self._thread = threading.Thread(
+                target=self._run, name="ajei-pageview-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.max_age)
+            self._wake.clear()
+            self.flush()
+            close_old_connections()
+
+    def flush(self):
+        """Write the waiting page views now"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            PAGEVIEW_BUFFER_DEPTH.set(0)
+            self.write(rows)
+
+    def write(self, rows):
+        started = time.perf_counter()
+        views = []
+        for fields in rows:
+            location = lookup(fields.get("ip_address"))
+            views.append(
+                PageView(country=location.country, city=location.city, **fields)
+            )
+        try:
+            # A savepoint keeps a failure from breaking an enclosing
+            # transaction (writes without the buffer happen in the request)
+            with transaction.atomic():
+                PageView.objects.bulk_create(views, batch_size=500)
+        except OperationalError:
+            # The database is unavailable (e.g. SQLite locked): try the whole
+            # batch again later
+            logger.exception(
+                "Error writing %d page views, retrying with the next batch",
+                len(views),
+                extra={"duration_ms": round((time.perf_counter() - started) * 1000, 1)},
+            )
+            self._requeue(rows)
+            return
+        except Exception:
+            # A bad row (e.g. a value too long for its column) fails the
+            # whole batch: write the rows one by one to keep the others
+            logger.exception(
+                "Error writing %d page views, writing them one by one",
+                len(views),
+                extra={"duration_ms": round((time.perf_counter() - started) * 1000, 1)},
+            )
+            views = self._write_each(rows, views)
+        try:
+            count_landings(views)
+        except Exception:
+            logger.exception(
+                "Error counting the landings of %d written page views", len(views)
+            )
+
+    def _write_each(self, rows, views):
+        """Insert the views one at a time; returns those written"""
+        written = []
+        for i, view in enumerate(views):
+            try:
+                with transaction.atomic():
+                    PageView.objects.bulk_create([view])
+            except OperationalError:
+                logger.exception("Error writing a page view, retrying later")
+                self._requeue(rows[i:])
+                break
+            except Exception:
+                logger.exception(
+                    "Error writing a page view, dropping it",
+                    extra={"page_path": str(view.page_path)[:200]},
+                )
+                PAGEVIEWS_DROPPED.inc(reason="error")
+            else:
+                written.append(view)
+        return written
+
+
+buffer = PageViewBuffer()
+atexit.register(buffer.flush)
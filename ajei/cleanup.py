@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+from .models import PageView
+from .versions import state_dir
+
+
+# Session engines that keep their sessions in the django_session table
+DB_SESSION_ENGINES = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+class PruneTask:
+    """
+    Rows to delete, walked in ``key`` order so every batch starts where the
+    previous one stopped (keyset pagination: no OFFSET, no growing scan).
+    Subclasses define ``queryset(now)``, the rows to delete.
+    """
+
+    name = None
+    key = "pk"
+
+    def upper_bound(self, now):
+        """Largest key that can match, to stop early (None: walk to the end)"""
+        return None
+
+
+class ExpiredSessions(PruneTask):
+    name = "sessions"
+    key = "session_key"
+
+    def queryset(self, now):
+        return Session.objects.filter(expire_date__lt=now)
+
+
+class OldPageViews(PruneTask):
+    """
+    Page views older than the retention period. The walk stops at the id of
+    the last view before the cutoff (ids grow with viewed_at; read from the
+    end of the viewed_at index, not by aggregating the old rows) instead of
+    going through the recent rows.
+    """
+
+    def __init__(self, name, days, bots_only=False):
+        self.name = name
+        self.days = days
+        self.bots_only = bots_only
+
+    def queryset(self, now):
+        views = PageView.objects.filter(viewed_at__lt=now - timedelta(days=self.days))
+        return views.filter(is_bot=True) if self.bots_only else views
+
+    def upper_bound(self, now):
+        last = (
+            PageView.objects.filter(viewed_at__lt=now - timedelta(days=self.days))
+            .order_by("-viewed_at", "-id")
+            .values_list("id", flat=True)[:1]
+        )
+        return last[0] if last else 0
+
+
+def default_tasks():
+    """
+    The cleanup tasks enabled by the settings: expired sessions (database
+    session engines only) and page views past AJEI_BOT_PAGEVIEW_RETENTION_DAYS
+    (bots) or AJEI_PAGEVIEW_RETENTION_DAYS (all)
+    """
+    tasks = []
+    if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+        tasks.append(ExpiredSessions())
+    bot_days = getattr(settings, "AJEI_BOT_PAGEVIEW_RETENTION_DAYS", None)
+    if bot_days is not None:
+        tasks.append(OldPageViews("bot_pageviews", bot_days, bots_only=True))
+    days = getattr(settings, "AJEI_PAGEVIEW_RETENTION_DAYS", None)
+    if days is not None:
+        tasks.append(OldPageViews("pageviews", days))
+    return tasks
+
+
+class CleanupState:
+    """
+    Last key deleted by each unfinished task, in AJEI_STATE_DIR, so an
+    interrupted run resumes where it stopped
+    """
+
+    def __init__(self, path=None):
+        self.path = path or state_dir() / "cleanup.json"
+        try:
+            self.cursors = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.cursors = {}
+
+    def get(self, name):
+        return self.cursors.get(name)
+
+    def set(self, name, cursor):
+        if cursor is None:
+            self.cursors.pop(name, None)
+        else:
+            self.cursors[name] = cursor
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.cursors))
+        os.replace(tmp_path, self.path)
+
+
+def prune(
+    task,
+    state,
+    batch_size,
+    pause=0.0,
+    deadline=None,
+    progress=None,
+    clock=time.monotonic,
+):
+    """
+    Delete the rows of a task in batches of ``batch_size`` keys, each its
+    own short statement (and transaction), sleeping ``pause`` seconds
+    between batches so live requests get the database in between.
+
+    Stops at ``deadline`` (a ``clock()`` value, time.monotonic() by
+    default) with the cursor saved in ``state``; returns (rows deleted,
+    finished). ``progress`` is called after every batch with the task, the
+    rows deleted so far and the cursor.
+    """
+    now = timezone.now()
+    rows = task.queryset(now)
+    upper = task.upper_bound(now)
+    if upper is not None:
+        rows = rows.filter(**{f"{task.key}__lte": upper})
+    cursor = state.get(task.name)
+    deleted = 0
+    while True:
+        if deadline is not None and clock() >= deadline:
+            return deleted, False
+        batch = rows if cursor is None else rows.filter(**{f"{task.key}__gt": cursor})
+        keys = list(
+            batch.order_by(task.key).values_list(task.key, flat=True)[:batch_size]
+        )
+        if not keys:
+            state.set(task.name, None)
+            return deleted, True
+        # The filters are applied again: a session may have been extended
+        # since it was read
+        count, _ = rows.filter(**{f"{task.key}__in": keys}).delete()
+        deleted += count
+        cursor = keys[-1]
+        state.set(task.name, cursor)
+        if progress:
+            progress(task, deleted, cursor)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,207 @@
+from datetime import timedelta
+
+from django.db.models import Count, IntegerField, Q, Sum
+from django.db.models.functions import Cast, Round, TruncDate, TruncHour
+from django.utils import timezone
+
+from .funnel import campaign_report, conversions
+from .models import ContactSubmission, DailyDownload, PageView
+from .widgets import widget
+
+
+def weighted_count():
+    """
+    Number of page views, scaled back up by the sample weight of each row
+    """
+    return Cast(Round(Sum("sample_weight")), IntegerField())
+
+
+def weighted_total(queryset):
+    """Sampling-corrected number of page views in a queryset"""
+    return queryset.aggregate(total=weighted_count())["total"] or 0
+
+
+def start_of_today():
+    # A range rather than __date, which no index can answer
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def human_views():
+    # Bots are tagged at ingest and left out of the numbers; rows may be
+    # sampled, so counts are summed sample weights
+    return PageView.objects.filter(is_bot=False)
+
+
+@widget("contact_counts", ttl=60)
+def contact_counts():
+    now = timezone.now()
+    contacts = ContactSubmission.objects
+    return {
+        "total_contacts": contacts.count(),
+        "new_contacts": contacts.filter(status="new").count(),
+        "contacts_today": contacts.filter(created_at__gte=start_of_today()).count(),
+        "contacts_this_week": contacts.filter(
+            created_at__gte=now - timedelta(days=7)
+        ).count(),
+        "contacts_this_month": contacts.filter(
+            created_at__gte=now - timedelta(days=30)
+        ).count(),
+    }
+
+
+@widget("view_counts", ttl=60)
+def view_counts():
+    now = timezone.now()
+    page_views = human_views()
+    today = start_of_today()
+    last_7_days = now - timedelta(days=7)
+    return {
+        "total_views": weighted_total(page_views),
+        "views_today": weighted_total(page_views.filter(viewed_at__gte=today)),
+        "views_this_week": weighted_total(page_views.filter(viewed_at__gte=last_7_days)),
+        "views_this_month": weighted_total(
+            page_views.filter(viewed_at__gte=now - timedelta(days=30))
+        ),
+        # Unique visitors (by IP, as observed: not corrected for sampling)
+        "unique_visitors_today": page_views.filter(viewed_at__gte=today)
+        .values("ip_address")
+        .distinct()
+        .count(),
+        "unique_visitors_week": page_views.filter(viewed_at__gte=last_7_days)
+        .values("ip_address")
+        .distinct()
+        .count(),
+    }
+
+
+@widget("contacts_by_status")
+def contacts_by_status():
+    return {
+        "contacts_by_status": list(
+            ContactSubmission.objects.values("status")
+            .annotate(count=Count("id"))
+            .order_by("-count")
+        )
+    }
+
+
+@widget("contacts_by_type")
+def contacts_by_type():
+    return {
+        "contacts_by_type": list(
+            ContactSubmission.objects.exclude(
+                Q(investment_type__isnull=True) | Q(investment_type="")
+            )
+            .values("investment_type")
+            .annotate(count=Count("id"))
+            .order_by("-count")
+        )
+    }
+
+
+@widget("popular_pages")
+def popular_pages():
+    return {
+        "popular_pages": list(
+            human_views()
+            .values("page_path")
+            .annotate(count=weighted_count())
+            .order_by("-count")[:10]
+        )
+    }
+
+
+@widget("views_by_day")
+def views_by_day():
+    # Last 7 days
+    return {
+        "views_by_day": list(
+            human_views()
+            .filter(viewed_at__gte=timezone.now() - timedelta(days=7))
+            .annotate(day=TruncDate("viewed_at"))
+            .values("day")
+            .annotate(count=weighted_count())
+            .order_by("day")
+        )
+    }
+
+
+@widget("views_by_hour")
+def views_by_hour():
+    # Last 24 hours
+    return {
+        "views_by_hour": list(
+            human_views()
+            .filter(viewed_at__gte=timezone.now() - timedelta(hours=24))
+            .annotate(hour=TruncHour("viewed_at"))
+            .values("hour")
+            .annotate(count=weighted_count())
+            .order_by("hour")
+        )
+    }
+
+
+@widget("language_stats")
+def language_stats():
+    return {
+        "language_stats": list(
+            human_views()
+            .exclude(Q(language="") | Q(language__isnull=True))
+            .values("language")
+            .annotate(count=weighted_count())
+            .order_by("-count")
+        )
+    }
+
+
+@widget("funnel")
+def funnel():
+    # Visitor-to-lead funnel, from the daily rollup (last 30 days)
+    since = (timezone.now() - timedelta(days=30)).date()
+    return {
+        "funnel_pages": conversions(since, ["landing_path", "language"]),
+        "funnel_referrers": conversions(since, ["referrer_host"], limit=10),
+        "campaigns": campaign_report(since),
+    }
+
+
+@widget("locations")
+def locations():
+    # Where visitors and leads come from (empty without a GeoIP database)
+    since = timezone.now() - timedelta(days=30)
+    recent = human_views().filter(viewed_at__gte=since)
+    return {
+        "views_by_country": list(
+            recent.exclude(country="")
+            .values("country")
+            .annotate(count=weighted_count())
+            .order_by("-count")[:10]
+        ),
+        "views_by_city": list(
+            recent.exclude(city="")
+            .values("country", "city")
+            .annotate(count=weighted_count())
+            .order_by("-count")[:10]
+        ),
+        "contacts_by_country": list(
+            ContactSubmission.objects.filter(created_at__gte=since)
+            .exclude(country="")
+            .values("country")
+            .annotate(count=Count("id"))
+            .order_by("-count")[:10]
+        ),
+    }
+
+
+@widget("top_downloads")
+def top_downloads():
+    # Downloads started (portfolio PDF, renders)
+    since = (timezone.now() - timedelta(days=30)).date()
+    return {
+        "top_downloads": list(
+            DailyDownload.objects.filter(date__gte=since)
+            .values("file")
+            .annotate(total=Sum("downloads"))
+            .order_by("-total")[:10]
+        )
+    }
@@ -0,0 +1,196 @@
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils import timezone
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+)
+
+from .models import DailyDownload
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def resolve(section, name):
+    """
+    Absolute path of a file in one of the AJEI_DOWNLOAD_DIRS, or Http404.
+    safe_join rejects names escaping the directory.
+    """
+    directories = getattr(settings, "AJEI_DOWNLOAD_DIRS", {})
+    if section not in directories:
+        raise Http404
+    try:
+        path = Path(safe_join(directories[section], name))
+    except SuspiciousFileOperation:
+        raise Http404
+    if not path.is_file():
+        raise Http404
+    return path
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def requested_range(request, size, etag, last_modified):
+    """
+    The (first, last) byte positions asked for by a single-range Range
+    header, None to send the whole file (no Range header, several ranges,
+    or an If-Range validator that no longer matches), or False if the range
+    can't be satisfied
+    """
+    header = request.META.get("HTTP_RANGE", "")
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match:
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range:
+        if if_range.startswith(('"', "W/")):
+            # Ranges need a strong validator
+            if parse_etags(if_range) != [etag]:
+                return None
+        elif parse_http_date_safe(if_range) != last_modified:
+            return None
+    start, end = match.groups()
+    if not start and not end:
+        return False
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    first = int(start)
+    last = min(int(end), size - 1) if end else size - 1
+    if first >= size or first > last:
+        return False
+    return first, last
+
+
+class RangeFile:
+    """
+    Read-only view of ``length`` bytes of a file starting at ``offset``,
+    streamed by FileResponse in blocks
+    """
+
+    def __init__(self, path, offset, length):
+        self.file = open(path, "rb")
+        self.file.seek(offset)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def offload_headers(section, name, path):
+    """
+    Headers handing the transfer over to the front-end web server
+    (AJEI_SENDFILE_BACKEND), which then also answers Range requests. Empty
+    when files are sent by Django.
+    """
+    backend = getattr(settings, "AJEI_SENDFILE_BACKEND", None)
+    if backend == "nginx":
+        prefix = getattr(settings, "AJEI_SENDFILE_URL_PREFIX", "/protected/")
+        return {"X-Accel-Redirect": quote(f"{prefix.rstrip('/')}/{section}/{name}")}
+    if backend == "apache":
+        return {"X-Sendfile": str(path)}
+    return {}
+
+
+def serve(request, section, name):
+    """
+    Response for a download: 304/412 for conditional requests, 206 with the
+    requested bytes for a Range request, 416 for a range past the end, or
+    the whole file, sent by the front-end server when an offload backend is
+    configured
+    """
+    path = resolve(section, name)
+    stat = path.stat()
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return response
+
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    offload = offload_headers(section, name, path)
+    byte_range = None if offload else requested_range(
+        request, stat.st_size, etag, last_modified
+    )
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+
+    if offload or request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        for header, value in offload.items():
+            response[header] = value
+        if not offload:
+            response["Content-Length"] = stat.st_size
+    elif byte_range:
+        first, last = byte_range
+        response = FileResponse(
+            RangeFile(path, first, last - first + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = last - first + 1
+        response["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Content-Disposition"] = content_disposition_header(False, path.name)
+    patch_cache_control(response, public=True, max_age=86400)
+    return response
+
+
+def is_new_download(request, response):
+    """
+    Whether a response starts a download: the whole file, or its first
+    bytes. Resumed and chunked transfers, and revalidations, are not counted
+    again.
+    """
+    if request.method != "GET" or response.status_code not in (200, 206):
+        return False
+    byte_range = request.META.get("HTTP_RANGE", "").replace(" ", "")
+    return not byte_range or byte_range.startswith("bytes=0-")
+
+
+def record_download(section, name):
+    """Add one to today's download count of a file"""
+    key = {"date": timezone.now().date(), "file": f"{section}/{name}"[:255]}
+    if DailyDownload.objects.filter(**key).update(downloads=F("downloads") + 1):
+        return
+    try:
+        with transaction.atomic():
+            DailyDownload.objects.create(**key, downloads=1)
+    except IntegrityError:
+        DailyDownload.objects.filter(**key).update(downloads=F("downloads") + 1)
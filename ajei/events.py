@@ -0,0 +1,109 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+
+class EventBus:
+    """
+    In-process counters of the page views and contact submissions this
+    worker has handled, read by the live dashboard (see dashboard_events).
+
+    Publishing is a few in-memory operations under a lock. Subscribers don't
+    get a queue each: they read a snapshot that is computed at most once per
+    second and shared, so ten dashboards cost the same as one and nothing
+    hits the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = 0
+        self.contacts = 0
+        self._recent_views = deque()
+        # Visitor -> last seen, least recently seen first
+        self._visitors = OrderedDict()
+        self._snapshot = None
+        self._snapshot_at = 0.0
+
+    @property
+    def active_window(self):
+        return getattr(settings, "AJEI_ACTIVE_VISITOR_WINDOW", 300)
+
+    def _prune(self, now):
+        while self._recent_views and now - self._recent_views[0] > 60:
+            self._recent_views.popleft()
+        window = self.active_window
+        while self._visitors and now - next(iter(self._visitors.values())) > window:
+            self._visitors.popitem(last=False)
+
+    def page_viewed(self, visitor):
+        now = time.monotonic()
+        with self._lock:
+            self.views += 1
+            self._recent_views.append(now)
+            self._visitors[visitor] = now
+            self._visitors.move_to_end(visitor)
+            self._prune(now)
+
+    def contact_submitted(self):
+        with self._lock:
+            self.contacts += 1
+
+    def snapshot(self, max_age=1.0):
+        """
+        Cumulative counters and current gauges, recomputed at most every
+        ``max_age`` seconds
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._snapshot is None or now - self._snapshot_at >= max_age:
+                self._prune(now)
+                self._snapshot = {
+                    "views": self.views,
+                    "contacts": self.contacts,
+                    "views_last_minute": len(self._recent_views),
+                    "active_visitors": len(self._visitors),
+                }
+                self._snapshot_at = now
+            return self._snapshot
+
+
+bus = EventBus()
+
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_stream(bus, interval=1.0, keepalive=15.0):
+    """
+    Server-sent events with the counter deltas since the previous message
+    ("views", "contacts") and the current gauges ("views_last_minute",
+    "active_visitors"). A message is only sent when something changed; a
+    comment line keeps idle connections open through proxies.
+    """
+    yield "retry: 5000\n\n"
+    last = None
+    idle = 0.0
+    while True:
+        snapshot = bus.snapshot(interval)
+        if snapshot != last:
+            yield sse_message(
+                "stats",
+                {
+                    "views": snapshot["views"] - last["views"] if last else 0,
+                    "contacts": snapshot["contacts"] - last["contacts"] if last else 0,
+                    "views_last_minute": snapshot["views_last_minute"],
+                    "active_visitors": snapshot["active_visitors"],
+                },
+            )
+            last = snapshot
+            idle = 0.0
+        elif idle >= keepalive:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        await asyncio.sleep(interval)
+        idle += interval
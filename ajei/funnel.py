@@ -0,0 +1,221 @@
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .attribution import attribution
+from .models import ContactSubmission, DailyConversion
+
+
+# Signed cookie holding where the visitor landed: tracking a landing never
+# creates a session
+COOKIE_NAME = "ajei_landing"
+COOKIE_SALT = "ajei.funnel.landing"
+
+
+def cookie_age():
+    return getattr(settings, "AJEI_LANDING_COOKIE_AGE", settings.SESSION_COOKIE_AGE)
+
+
+def get_landing(request):
+    """The landing stored in the visitor's cookie, or None"""
+    value = request.COOKIES.get(COOKIE_NAME)
+    if not value:
+        return None
+    try:
+        return signing.loads(value, salt=COOKIE_SALT, max_age=cookie_age())
+    except signing.BadSignature:
+        return None
+
+
+def record_landing(request, response, path, language, origin):
+    """
+    Remember where a visitor landed, on its first tracked page view, in a
+    signed cookie set on ``response``. ``origin`` is the visit's
+    ajei.attribution.Attribution. Returns whether this view is the landing:
+    its page view is then stored with is_landing and counted as a visitor
+    when it is written (see count_landings). Views of a visitor who already
+    has the cookie are not landings.
+    """
+    if get_landing(request) is not None:
+        return False
+    landing = {
+        "path": path[:200],
+        "language": language,
+        "referrer": origin.referrer_host,
+        "source": origin.source,
+        "medium": origin.medium,
+        "campaign": origin.campaign,
+        "at": timezone.now().isoformat(),
+    }
+    response.set_cookie(
+        COOKIE_NAME,
+        signing.dumps(landing, salt=COOKIE_SALT, compress=True),
+        max_age=cookie_age(),
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
+    return True
+
+
+def count_landings(views):
+    """
+    Add the landings among written page views (PageView instances) to the
+    visitors of their day's conversion row: the sample weights are summed
+    per row, so a batch costs one UPDATE per row it touches. These are the
+    views rebuild_conversions counts (human, is_landing).
+    """
+    visitors = defaultdict(float)
+    for view in views:
+        if view.is_landing and not view.is_bot:
+            key = (
+                timezone.localdate(view.viewed_at),
+                view.page_path[:200],
+                view.language,
+                view.referrer_host,
+                view.utm_source,
+                view.utm_medium,
+                view.utm_campaign,
+            )
+            visitors[key] += view.sample_weight
+    for (date, path, language, referrer, source, medium, campaign), weight in (
+        visitors.items()
+    ):
+        landing = {
+            "path": path,
+            "language": language,
+            "referrer": referrer,
+            "source": source,
+            "medium": medium,
+            "campaign": campaign,
+        }
+        increment(date, landing, "visitors", round(weight))
+
+
+def landing_for(request):
+    """
+    Contact submission fields linking it to the visitor's session, landing
+    page and campaign
+    """
+    landing = get_landing(request)
+    if not landing:
+        # No tracked landing (e.g. cookies were blocked): the form was posted
+        # from the landing page, whose query string may name the campaign
+        origin = attribution(request.META.get("HTTP_REFERER", "").partition("?")[2], "")
+        landing = {
+            "source": origin.source,
+            "medium": origin.medium,
+            "campaign": origin.campaign,
+        }
+    at = landing.get("at")
+    return {
+        "session_key": request.session.session_key or "",
+        "landing_path": landing.get("path", ""),
+        "landing_language": landing.get("language", ""),
+        "landing_referrer": landing.get("referrer", ""),
+        "landed_at": datetime.fromisoformat(at) if at else None,
+        "utm_source": landing.get("source", ""),
+        "utm_medium": landing.get("medium", ""),
+        "utm_campaign": landing.get("campaign", ""),
+    }
+
+
+def record_submission(contact):
+    """Count a contact submission in today's row of its landing page"""
+    increment(
+        timezone.localdate(),
+        {
+            "path": contact.landing_path,
+            "language": contact.landing_language,
+            "referrer": contact.landing_referrer,
+            "source": contact.utm_source,
+            "medium": contact.utm_medium,
+            "campaign": contact.utm_campaign,
+        },
+        "submissions",
+    )
+
+
+def increment(date, landing, field, amount=1):
+    """
+    Add ``amount`` to a counter of a DailyConversion row, creating the row if
+    needed. A single UPDATE in the common case; a concurrent creation of the
+    same row is retried as an UPDATE.
+    """
+    key = {
+        "date": date,
+        "landing_path": landing["path"],
+        "language": landing["language"],
+        "referrer_host": landing["referrer"],
+        "utm_source": landing["source"],
+        "utm_medium": landing["medium"],
+        "utm_campaign": landing["campaign"],
+    }
+    if DailyConversion.objects.filter(**key).update(**{field: F(field) + amount}):
+        return
+    try:
+        with transaction.atomic():
+            DailyConversion.objects.create(**key, **{field: amount})
+    except IntegrityError:
+        DailyConversion.objects.filter(**key).update(**{field: F(field) + amount})
+
+
+def conversions(since, fields, limit=None):
+    """
+    Visitors, submissions and conversion rate (submissions per 100 visitors)
+    since a date, grouped by some of the landing dimensions ("landing_path",
+    "language", "referrer_host", "utm_source", "utm_medium", "utm_campaign"),
+    read from the daily rollup
+    """
+    rows = (
+        DailyConversion.objects.filter(date__gte=since)
+        .values(*fields)
+        .annotate(total_visitors=Sum("visitors"), total_submissions=Sum("submissions"))
+        .order_by("-total_submissions", "-total_visitors")
+    )
+    if limit:
+        rows = rows[:limit]
+    return [
+        {
+            **row,
+            "rate": (
+                100 * row["total_submissions"] / row["total_visitors"]
+                if row["total_visitors"]
+                else 0
+            ),
+        }
+        for row in rows
+    ]
+
+
+def campaign_report(since, limit=20):
+    """
+    Per-campaign visitors, leads and conversion rate from the rollup, plus
+    lead quality (leads qualified or converted since) from the submissions'
+    (utm_campaign, status) index
+    """
+    campaigns = [
+        row
+        for row in conversions(since, ["utm_source", "utm_medium", "utm_campaign"])
+        if row["utm_campaign"] or row["utm_source"]
+    ][:limit]
+    qualified = {
+        (row["utm_source"], row["utm_medium"], row["utm_campaign"]): row["count"]
+        for row in ContactSubmission.objects.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(since, time.min)),
+            utm_campaign__in={row["utm_campaign"] for row in campaigns},
+            status__in=["qualified", "converted"],
+        )
+        .values("utm_source", "utm_medium", "utm_campaign")
+        .annotate(count=Count("id"))
+        .order_by()
+    }
+    for row in campaigns:
+        key = (row["utm_source"], row["utm_medium"], row["utm_campaign"])
+        row["qualified"] = qualified.get(key, 0)
+    return campaigns
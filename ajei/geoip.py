@@ -0,0 +1,77 @@
+import logging
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+
+try:
+    import maxminddb
+except ImportError:  # Optional dependency: without it there is no enrichment
+    maxminddb = None
+
+
+logger = logging.getLogger(__name__)
+
+Location = namedtuple("Location", "country city")
+
+UNKNOWN = Location("", "")
+
+_lock = threading.Lock()
+_reader = None
+_opened = False
+
+
+def get_reader():
+    """
+    Reader of the AJEI_GEOIP_DATABASE file (a MaxMind DB such as GeoLite2
+    City), opened once per process and memory-mapped so the workers share
+    the pages of the file. None when no database is configured, the file
+    can't be opened or the maxminddb package isn't installed.
+    """
+    global _reader, _opened
+    if _opened:
+        return _reader
+    with _lock:
+        if not _opened:
+            path = getattr(settings, "AJEI_GEOIP_DATABASE", None)
+            if path and maxminddb is None:
+                logger.warning("AJEI_GEOIP_DATABASE is set but maxminddb is not installed")
+            elif path:
+                try:
+                    _reader = maxminddb.open_database(str(path), maxminddb.MODE_MMAP)
+                except (OSError, ValueError):
+                    logger.exception("Could not open the GeoIP database %s", path)
+            _opened = True
+    return _reader
+
+
+@lru_cache(maxsize=16384)
+def lookup(ip_address):
+    """
+    Country code and English city name of an IP address, from the local
+    database only (no network calls). Cached: visitors come back, and a page
+    view batch often holds several views of the same visitor.
+    """
+    reader = get_reader()
+    if reader is None or not ip_address:
+        return UNKNOWN
+    try:
+        record = reader.get(ip_address)
+    except ValueError:
+        return UNKNOWN
+    if not record:
+        return UNKNOWN
+    country = (record.get("country") or record.get("registered_country") or {}).get(
+        "iso_code", ""
+    )
+    city = ((record.get("city") or {}).get("names") or {}).get("en", "")
+    return Location(country[:2], city[:100])
+
+
+def cache_info():
+    return lookup.cache_info()
+
+
+def cache_clear():
+    lookup.cache_clear()
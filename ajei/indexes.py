@@ -0,0 +1,68 @@
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddIndex, RemoveIndex
+
+
+class OnlineIndexMixin:
+    """
+    Build and drop indexes without blocking writes to the table, for
+    migrations on large tables. PostgreSQL does it CONCURRENTLY, which can't
+    run in a transaction: the migration must set ``atomic = False``. MySQL
+    (InnoDB) already builds indexes in place without locking the table, and
+    SQLite databases are small enough for a plain CREATE INDEX.
+    """
+
+    def concurrently(self, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return False
+        if schema_editor.connection.in_atomic_block:
+            raise NotSupportedError(
+                f"The {self.__class__.__name__} operation cannot be executed "
+                "inside a transaction (set atomic = False on the migration)."
+            )
+        return True
+
+
+class AddIndexOnline(OnlineIndexMixin, AddIndex):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self.concurrently(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self.concurrently(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class RemoveIndexOnline(OnlineIndexMixin, RemoveIndex):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self.concurrently(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            index = from_state.models[app_label, self.model_name_lower].get_index_by_name(
+                self.name
+            )
+            schema_editor.remove_index(model, index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self.concurrently(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            index = to_state.models[app_label, self.model_name_lower].get_index_by_name(
+                self.name
+            )
+            schema_editor.add_index(model, index, concurrently=True)
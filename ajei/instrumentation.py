@@ -0,0 +1,79 @@
+import time
+from contextvars import ContextVar
+
+from django.template.base import Template
+
+
+# Metrics of the request being handled in the current thread / task, or None
+# when the request is not instrumented
+current_metrics = ContextVar("ajei_request_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Query count, SQL time and template render time of a single request
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper (see connection.execute_wrapper)"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, total_time):
+        """Value of the Server-Timing header, durations in milliseconds"""
+        return ", ".join(
+            [
+                f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+                f"tpl;dur={self.template_time * 1000:.1f}",
+                f"total;dur={total_time * 1000:.1f}",
+            ]
+        )
+
+
+# Template._render as it was before install_template_timing() wrapped it
+_wrapped_render = Template._render
+
+
+def _timed_render(self, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return _wrapped_render(self, context)
+    # Only the outermost template is timed, so {% include %} and
+    # {% extends %} are not counted twice
+    metrics._template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _wrapped_render(self, context)
+    finally:
+        metrics._template_depth -= 1
+        if not metrics._template_depth:
+            metrics.template_time += time.perf_counter() - start
+
+
+def install_template_timing():
+    """
+    Time template rendering for instrumented requests.
+
+    Django only sends the template_rendered signal under the test runner, so
+    this hooks Template._render the same way the test runner does. Requests
+    that are not instrumented only pay for a context variable lookup.
+    """
+    global _wrapped_render
+    if Template._render is not _timed_render:
+        _wrapped_render = Template._render
+        Template._render = _timed_render
@@ -0,0 +1,156 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+}
+
+
+def request_context(request):
+    """
+    Request fields to pass as ``extra`` when logging from a view or
+    middleware
+    """
+    match = getattr(request, "resolver_match", None)
+    return {
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match else "",
+        "ip_address": request.META.get("REMOTE_ADDR", ""),
+        "forwarded_for": request.META.get("HTTP_X_FORWARDED_FOR", ""),
+        "user_agent": request.META.get("HTTP_USER_AGENT", "")[:200],
+    }
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line, including any ``extra``
+    fields
+    """
+
+    def format(self, record):
+        data = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+# Request attribute set on requests answered by maintenance mode
+MAINTENANCE_MARK = "ajei_maintenance"
+
+
+class MaintenanceFilter(logging.Filter):
+    """
+    Drop the records of requests answered by maintenance mode: its 503s are
+    expected and don't belong in the django.request error log (or the
+    admin emails)
+    """
+
+    def filter(self, record):
+        return not getattr(getattr(record, "request", None), MAINTENANCE_MARK, False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most one identical record (same logger, level, message template
+    and exception type) through per ``interval`` seconds. The next record
+    that gets through carries the number of suppressed duplicates.
+    """
+
+    def __init__(self, interval=60, max_keys=1000):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._seen = {}
+
+    def filter(self, record):
+        exc_type = record.exc_info[0].__name__ if record.exc_info else ""
+        key = (record.name, record.levelno, str(record.msg), exc_type)
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._seen[key] = (last, suppressed + 1)
+                return False
+            if len(self._seen) >= self.max_keys:
+                self._seen.clear()
+            self._seen[key] = (now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+# Every BackgroundHandler, for dropped_records()
+_background_handlers = weakref.WeakSet()
+
+
+def dropped_records():
+    """Records dropped by the background handlers (exported by ajei.metrics)"""
+    return sum(handler.dropped for handler in list(_background_handlers))
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Hand records to a bounded queue drained by a background listener thread
+    that does the formatting and the I/O, so logging never blocks the
+    request thread. Records are dropped when the queue is full, and counted
+    in ajei_log_records_dropped_total.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+        _background_handlers.add(self)
+
+    def setFormatter(self, fmt):
+        # Formatting happens in the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        Make the record safe to hand over to another thread: merge the
+        arguments into the message and render the traceback now, while the
+        frames still exist. JSON formatting is left to the listener.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+from constance import config
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.cache import add_never_cache_headers, patch_vary_headers
+
+from .log import MAINTENANCE_MARK
+from .versions import state_dir
+
+
+TEMPLATE = "landing_page/maintenance.html"
+
+# Served when the flag is set but a language has no pre-rendered page
+FALLBACK_PAGE = (
+    "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Maintenance</title>"
+    "</head><body><h1>Down for maintenance</h1>"
+    "<p>We'll be back shortly.</p></body></html>"
+)
+
+# Dynamic settings shown on the page
+CONFIG_KEYS = ("SITE_NAME", "CONTACT_EMAIL", "CONTACT_PHONE", "WHATSAPP_NUMBER")
+
+
+def flag_path():
+    return state_dir() / "maintenance.flag"
+
+
+def page_path(language):
+    return state_dir() / "maintenance" / f"{language}.html"
+
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def site_config():
+    """
+    The dynamic settings the page shows, or their defaults when the database
+    can't be read (maintenance may be switched on because it is down)
+    """
+    try:
+        return {key: getattr(config, key) for key in CONFIG_KEYS}
+    except DatabaseError:
+        return {key: settings.CONSTANCE_CONFIG[key][0] for key in CONFIG_KEYS}
+
+
+def render_pages():
+    """
+    Render the maintenance page once per language into AJEI_STATE_DIR, so
+    serving it needs neither the database nor the template engine
+    """
+    context = {"config": site_config()}
+    for code, _ in settings.LANGUAGES:
+        with translation.override(code):
+            html = render_to_string(
+                TEMPLATE,
+                {
+                    **context,
+                    "LANGUAGE_CODE": code,
+                    "LANGUAGE_BIDI": translation.get_language_bidi(),
+                },
+            )
+        _write(page_path(code), html)
+
+
+def enable():
+    """Render the pages, then raise the flag every worker checks"""
+    render_pages()
+    _write(flag_path(), f"{time.time():.0f}\n")
+
+
+def sync():
+    """
+    Raise the flag (with freshly rendered pages) if the MAINTENANCE_MODE
+    setting is on: a new or wiped AJEI_STATE_DIR would otherwise ignore it.
+    Nothing happens when the database can't be read. The flag is never
+    lowered here, since the maintenance command may have raised it while
+    the setting couldn't be saved.
+    """
+    try:
+        enabled = config.MAINTENANCE_MODE
+    except DatabaseError:
+        return
+    if enabled:
+        enable()
+
+
+def disable():
+    try:
+        flag_path().unlink()
+    except FileNotFoundError:
+        pass
+
+
+def is_enabled():
+    return flag_path().exists()
+
+
+def load_pages():
+    """Pre-rendered pages by language code"""
+    pages = {}
+    for code, _ in settings.LANGUAGES:
+        try:
+            pages[code] = page_path(code).read_text(encoding="utf-8")
+        except OSError:
+            pass
+    return pages
+
+
+class MaintenanceState:
+    """
+    Whether maintenance mode is on, from the flag file's modification time,
+    checked at most once per ``interval`` seconds. The pages are read from
+    disk when the flag changes and kept in memory while it is up.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.version = None
+        self.pages = None
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+
+    def check(self):
+        """The pre-rendered pages while maintenance mode is on, else None"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self.pages
+        with self._lock:
+            if now < self._next_check:
+                return self.pages
+            self._next_check = now + self.interval
+            try:
+                version = os.stat(flag_path()).st_mtime_ns
+            except OSError:
+                version = None
+            if version != self.version:
+                self.version = version
+                self.pages = None if version is None else load_pages()
+        return self.pages
+
+
+def response(request, pages):
+    """
+    503 Service Unavailable with the page in the visitor's language (from
+    the language cookie or Accept-Language: no session, no database). The
+    request is marked so ajei.log.MaintenanceFilter keeps it out of the
+    django.request log.
+    """
+    language = translation.get_language_from_request(request)
+    html = pages.get(language) or pages.get(settings.LANGUAGE_CODE) or FALLBACK_PAGE
+    result = HttpResponse(html, status=503)
+    result["Retry-After"] = str(getattr(settings, "AJEI_MAINTENANCE_RETRY_AFTER", 600))
+    result["Content-Language"] = language
+    patch_vary_headers(result, ("Accept-Language", "Cookie"))
+    add_never_cache_headers(result)
+    setattr(request, MAINTENANCE_MARK, True)
+    return result
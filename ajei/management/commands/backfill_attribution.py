@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ajei.attribution import attribution
+from ajei.models import ContactSubmission, PageView
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the referrer host and UTM columns of page views and contact "
+        "submissions recorded before they were parsed at ingest"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        batch_size = options["batch_size"]
+
+        views = PageView.objects.exclude(referrer="").filter(
+            referrer_host="", utm_source="", utm_campaign=""
+        )
+        updated = self._backfill(
+            views,
+            batch_size,
+            lambda referrer: attribution("", referrer),
+            lambda origin: {
+                "referrer_host": origin.referrer_host,
+                "utm_source": origin.source,
+                "utm_medium": origin.medium,
+                "utm_campaign": origin.campaign,
+            },
+        )
+        self.stdout.write(f"Updated {updated:,} page views")
+
+        # The referrer of a submission is the landing page the form was on,
+        # whose query string carries the campaign
+        contacts = ContactSubmission.objects.exclude(referrer="").filter(
+            utm_source="", utm_campaign=""
+        )
+        updated = self._backfill(
+            contacts,
+            batch_size,
+            lambda referrer: attribution(referrer.partition("?")[2], ""),
+            lambda origin: {
+                "utm_source": origin.source,
+                "utm_medium": origin.medium,
+                "utm_campaign": origin.campaign,
+            },
+        )
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated:,} contact submissions"))
+
+    def _backfill(self, queryset, batch_size, parse, fields):
+        """
+        Walk the rows in primary key order, batch by batch, and update each
+        batch with one UPDATE per distinct parse result. Rows that parse to
+        nothing are left alone.
+        """
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "referrer")[:batch_size]
+            )
+            if not batch:
+                return updated
+            last_id = batch[-1][0]
+            groups = defaultdict(list)
+            for row_id, referrer in batch:
+                origin = parse(referrer)
+                if any(origin):
+                    groups[origin].append(row_id)
+            for origin, ids in groups.items():
+                updated += queryset.model.objects.filter(id__in=ids).update(
+                    **fields(origin)
+                )
@@ -0,0 +1,79 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ajei.cleanup import CleanupState, default_tasks, prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions and page views past their retention period in "
+        "small batches, pausing between them. Interrupted runs (--max-seconds, "
+        "Ctrl-C) resume where they stopped. Meant to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "AJEI_CLEANUP_BATCH_SIZE", 500),
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=getattr(settings, "AJEI_CLEANUP_PAUSE", 0.1),
+            help="seconds to sleep between batches",
+        )
+        parser.add_argument(
+            "--max-seconds",
+            type=float,
+            default=0,
+            help="stop after this long, to resume on the next run (0: no limit)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="ignore the saved position and start from the beginning",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options["pause"] < 0 or options["max_seconds"] < 0:
+            raise CommandError("--pause and --max-seconds must not be negative")
+
+        deadline = None
+        if options["max_seconds"]:
+            deadline = time.monotonic() + options["max_seconds"]
+        state = CleanupState()
+        tasks = default_tasks()
+        if options["restart"]:
+            for task in tasks:
+                state.set(task.name, None)
+
+        def progress(task, deleted, cursor):
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"  {task.name}: {deleted:,} deleted (up to {cursor})")
+
+        for task in tasks:
+            resumed = state.get(task.name)
+            if resumed is not None:
+                self.stdout.write(f"{task.name}: resuming after {resumed}")
+            deleted, finished = prune(
+                task,
+                state,
+                options["batch_size"],
+                pause=options["pause"],
+                deadline=deadline,
+                progress=progress,
+            )
+            if not finished:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{task.name}: deleted {deleted:,}, stopped at the time "
+                        "limit (the next run resumes)"
+                    )
+                )
+                return
+            self.stdout.write(self.style.SUCCESS(f"{task.name}: deleted {deleted:,}"))
@@ -0,0 +1,284 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ajei.attribution import attribution
+from ajei.models import ContactSubmission, PageView
+
+
+BROWSER_USER_AGENTS = [
+    "Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (Linux; Android 13; Redmi Note 12) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36",
+]
+
+BOT_USER_AGENTS = [
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)",
+    "WhatsApp/2.23.20.0",
+    "Mozilla/5.0+(compatible; UptimeRobot/2.0; http://www.uptimerobot.com/)",
+]
+
+# (value, weight) pairs
+PATHS = [("/", 65), ("/ajei/", 35)]
+LANGUAGES = [("ar", 70), ("en", 30)]
+REFERRERS = [
+    ("", 40),
+    ("https://www.google.com/", 25),
+    ("https://www.facebook.com/", 15),
+    ("https://l.instagram.com/", 8),
+    ("https://www.google.com/search?q=ajei+october+gardens", 5),
+    ("https://www.facebook.com/?utm_source=facebook&utm_medium=paid&utm_campaign=ajei_launch", 7),
+]
+INVESTMENT_TYPES = [
+    ("medical", 35),
+    ("commercial", 25),
+    ("pharmacy", 10),
+    ("restaurant", 15),
+    ("other", 5),
+    (None, 10),
+]
+STATUSES = [
+    ("new", 40),
+    ("contacted", 25),
+    ("qualified", 15),
+    ("converted", 5),
+    ("closed", 15),
+]
+
+# Relative traffic per hour of the day (Cairo evenings peak) and per weekday
+# (Monday=0; Friday and Saturday are the weekend)
+HOUR_WEIGHTS = [2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 6, 6, 6, 7, 8, 9, 10, 11, 11, 9, 6, 4]
+WEEKDAY_WEIGHTS = [10, 10, 10, 11, 13, 12, 9]
+
+
+def split(pairs):
+    return [value for value, _ in pairs], [weight for _, weight in pairs]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate realistic PageView and ContactSubmission rows for "
+        "performance testing (deterministic for a given seed)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-views", type=int, default=1_000_000)
+        parser.add_argument("--contacts", type=int, default=5_000)
+        parser.add_argument("--days", type=int, default=180, help="history length")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--bot-share",
+            type=float,
+            default=0.1,
+            help="fraction of page views coming from bots",
+        )
+        parser.add_argument(
+            "--clear", action="store_true", help="delete existing rows first"
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--days and --batch-size must be positive")
+
+        self.rng = random.Random(options["seed"])
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.days = options["days"]
+        self.day_weights = self._day_weights()
+        # Visitors whose session exists (their first view is tracked before
+        # the session is created)
+        self.sessions = set()
+
+        if connection.vendor == "sqlite":
+            # Generated data can be regenerated: trade durability for speed
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=OFF")
+                # A large page cache keeps the index b-trees in memory
+                cursor.execute("PRAGMA cache_size=-262144")
+
+        if options["clear"]:
+            PageView.objects.all().delete()
+            ContactSubmission.objects.all().delete()
+
+        self._generate(
+            "page views",
+            options["page_views"],
+            options["batch_size"],
+            lambda n: self._page_views(n, options["bot_share"]),
+            PageView,
+        )
+        self._generate(
+            "contact submissions",
+            options["contacts"],
+            options["batch_size"],
+            self._contacts,
+            ContactSubmission,
+        )
+
+    def _generate(self, label, total, batch_size, build, model):
+        """
+        Insert rows built by ``build(n)`` (dicts of field values) with a
+        single prepared INSERT per batch. Going through executemany instead of
+        bulk_create skips model instantiation and per-field SQL compilation,
+        which dominate the cost at this volume. Fields the builder leaves out
+        get their model default.
+        """
+        started = time.monotonic()
+        created = 0
+        columns = None
+        while created < total:
+            size = min(batch_size, total - created)
+            rows = build(size)
+            if columns is None:
+                columns = list(rows[0])
+                defaults = tuple(
+                    field.get_default()
+                    for field in model._meta.concrete_fields
+                    if not field.primary_key and field.name not in columns
+                )
+                columns += [
+                    field.name
+                    for field in model._meta.concrete_fields
+                    if not field.primary_key and field.name not in columns
+                ]
+                sql = "INSERT INTO {} ({}) VALUES ({})".format(
+                    connection.ops.quote_name(model._meta.db_table),
+                    ", ".join(
+                        connection.ops.quote_name(model._meta.get_field(c).column)
+                        for c in columns
+                    ),
+                    ", ".join(["%s"] * len(columns)),
+                )
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, [tuple(row.values()) + defaults for row in rows])
+            created += size
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"\r{label}: {created:,}/{total:,} ({created / elapsed:,.0f} rows/s)",
+                ending="",
+            )
+            self.stdout.flush()
+        self.stdout.write("")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {total:,} {label} in {time.monotonic() - started:.1f}s"
+            )
+        )
+
+    def _day_weights(self):
+        """Traffic grows over time and follows the weekly pattern"""
+        start = self.now - timedelta(days=self.days)
+        return [
+            (1 + 2 * day / self.days)
+            * WEEKDAY_WEIGHTS[(start + timedelta(days=day)).weekday()]
+            for day in range(self.days)
+        ]
+
+    def _timestamps(self, n):
+        rng = self.rng
+        start = self.now - timedelta(days=self.days)
+        days = rng.choices(range(self.days), weights=self.day_weights, k=n)
+        hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=n)
+        # Sorted, so consecutive inserts land next to each other in the
+        # timestamp indexes
+        return sorted(
+            start + timedelta(days=day, hours=hour, seconds=rng.random() * 3600)
+            for day, hour in zip(days, hours)
+        )
+
+    def _page_views(self, n, bot_share):
+        rng = self.rng
+        adapt = connection.ops.adapt_datetimefield_value
+        paths = rng.choices(*split(PATHS), k=n)
+        languages = rng.choices(*split(LANGUAGES), k=n)
+        referrers = rng.choices(*split(REFERRERS), k=n)
+        timestamps = self._timestamps(n)
+
+        views = []
+        for i in range(n):
+            bot = rng.random() < bot_share
+            # Visitors come back: draw from a pool much smaller than the
+            # number of views, skewed towards a core of returning visitors
+            visitor = int(rng.paretovariate(1.2) * 1000) % 200_000
+            referrer = "" if bot else referrers[i]
+            origin = attribution("", referrer)
+            session_key = ""
+            landing = False
+            if not bot:
+                if visitor in self.sessions:
+                    session_key = f"{visitor:032x}"
+                else:
+                    self.sessions.add(visitor)
+                    landing = True
+            views.append(
+                {
+                    "page_path": paths[i],
+                    "ip_address": f"41.{visitor >> 16 & 255}.{visitor >> 8 & 255}.{visitor & 255}",
+                    "user_agent": rng.choice(BOT_USER_AGENTS if bot else BROWSER_USER_AGENTS),
+                    "referrer": referrer,
+                    "referrer_host": origin.referrer_host,
+                    "utm_source": origin.source,
+                    "utm_medium": origin.medium,
+                    "utm_campaign": origin.campaign,
+                    "session_key": session_key,
+                    "language": languages[i],
+                    "is_bot": bot,
+                    "is_landing": landing,
+                    "viewed_at": adapt(timestamps[i]),
+                }
+            )
+        return views
+
+    def _contacts(self, n):
+        rng = self.rng
+        adapt = connection.ops.adapt_datetimefield_value
+        types = rng.choices(*split(INVESTMENT_TYPES), k=n)
+        statuses = rng.choices(*split(STATUSES), k=n)
+        referrers = rng.choices(*split(REFERRERS), k=n)
+        landing_paths = rng.choices(*split(PATHS), k=n)
+        landing_languages = rng.choices(*split(LANGUAGES), k=n)
+        timestamps = self._timestamps(n)
+
+        contacts = []
+        for i in range(n):
+            number = rng.randrange(10**8)
+            origin = attribution("", referrers[i])
+            contacted_at = None
+            updated_at = timestamps[i]
+            if statuses[i] != "new":
+                contacted_at = min(
+                    timestamps[i] + timedelta(hours=rng.uniform(1, 72)), self.now
+                )
+                updated_at = contacted_at
+            contacts.append(
+                {
+                    "name": f"Investor {number}",
+                    "email": f"investor{number}@example.com",
+                    "phone": f"+2010{number:08d}",
+                    "investment_type": types[i],
+                    "status": statuses[i],
+                    "ip_address": f"41.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}",
+                    "user_agent": rng.choice(BROWSER_USER_AGENTS),
+                    "referrer": referrers[i],
+                    "session_key": f"{number:032x}",
+                    "landing_path": landing_paths[i],
+                    "landing_language": landing_languages[i],
+                    "landing_referrer": origin.referrer_host,
+                    "utm_source": origin.source,
+                    "utm_medium": origin.medium,
+                    "utm_campaign": origin.campaign,
+                    "landed_at": adapt(timestamps[i] - timedelta(minutes=rng.uniform(1, 30))),
+                    "created_at": adapt(timestamps[i]),
+                    "updated_at": adapt(updated_at),
+                    "contacted_at": adapt(contacted_at),
+                }
+            )
+        return contacts
@@ -0,0 +1,40 @@
+from constance import config
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from ajei import maintenance
+
+
+class Command(BaseCommand):
+    help = (
+        "Switch maintenance mode on or off: public pages answer 503 with a "
+        "page pre-rendered per language, without touching the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("state", choices=["on", "off", "status"])
+
+    def handle(self, *args, **options):
+        state = options["state"]
+        if state == "status":
+            self.stdout.write(
+                f"Maintenance mode is {'on' if maintenance.is_enabled() else 'off'}"
+            )
+            return
+
+        # The flag first: it is what the workers check, and it can be changed
+        # while the database is unavailable
+        if state == "on":
+            maintenance.enable()
+        else:
+            maintenance.disable()
+        try:
+            config.MAINTENANCE_MODE = state == "on"
+        except DatabaseError as e:
+            self.stderr.write(
+                self.style.WARNING(
+                    f"Could not update the MAINTENANCE_MODE setting ({e}); "
+                    "the flag file was changed anyway"
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(f"Maintenance mode is {state}"))
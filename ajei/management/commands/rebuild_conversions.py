@@ -0,0 +1,107 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ajei.models import ContactSubmission, DailyConversion, PageView
+
+
+ATTRIBUTION_FIELDS = ("referrer_host", "utm_source", "utm_medium", "utm_campaign")
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily visitor-to-lead rollup (DailyConversion) from the "
+        "page views and contact submissions"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="number of days to rebuild, counting today (0 rebuilds everything)",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 0:
+            raise CommandError("--days must not be negative")
+        since = None
+        if options["days"]:
+            since = timezone.now().date() - timedelta(days=options["days"] - 1)
+
+        # (date, landing path, language, referrer host, utm source, medium,
+        # campaign) -> [visitors, submissions]
+        rows = defaultdict(lambda: [0.0, 0])
+
+        # The views live ingest counts as landings (see ajei.funnel)
+        landings = PageView.objects.filter(is_bot=False, is_landing=True)
+        if since:
+            landings = landings.filter(viewed_at__date__gte=since)
+        landings = (
+            landings.annotate(day=TruncDate("viewed_at"))
+            .values("day", "page_path", "language", *ATTRIBUTION_FIELDS)
+            .annotate(visitors=Sum("sample_weight"))
+            .order_by()
+        )
+        for row in landings.iterator():
+            key = (
+                row["day"],
+                row["page_path"][:200],
+                row["language"],
+                *(row[field] for field in ATTRIBUTION_FIELDS),
+            )
+            rows[key][0] += row["visitors"]
+
+        submissions = ContactSubmission.objects.all()
+        if since:
+            submissions = submissions.filter(created_at__date__gte=since)
+        submissions = (
+            submissions.annotate(day=TruncDate("created_at"))
+            .values(
+                "day",
+                "landing_path",
+                "landing_language",
+                "landing_referrer",
+                *ATTRIBUTION_FIELDS[1:],
+            )
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        for row in submissions.iterator():
+            key = (
+                row["day"],
+                row["landing_path"],
+                row["landing_language"],
+                row["landing_referrer"],
+                *(row[field] for field in ATTRIBUTION_FIELDS[1:]),
+            )
+            rows[key][1] += row["count"]
+
+        conversions = [
+            DailyConversion(
+                date=date,
+                landing_path=path,
+                language=language,
+                **dict(zip(ATTRIBUTION_FIELDS, attribution)),
+                visitors=round(visitors),
+                submissions=count,
+            )
+            for (date, path, language, *attribution), (visitors, count) in rows.items()
+        ]
+        with transaction.atomic():
+            stale = DailyConversion.objects.all()
+            if since:
+                stale = stale.filter(date__gte=since)
+            deleted, _ = stale.delete()
+            DailyConversion.objects.bulk_create(conversions, batch_size=1000)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {len(rows)} conversion rows (replaced {deleted})"
+            )
+        )
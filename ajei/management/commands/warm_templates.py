@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ajei.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile every template through the cached template loader and report "
+        "the ones that fail. Workers do the same at boot (config/wsgi.py, "
+        "config/asgi.py)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--list-failures",
+            action="store_true",
+            help="print the templates that failed to compile",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        compiled, failed = warm_templates()
+        elapsed = time.monotonic() - started
+        if options["list_failures"]:
+            for name in failed:
+                self.stdout.write(f"  {name}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compiled {compiled} templates in {elapsed:.2f}s "
+                f"({len(failed)} failed)"
+            )
+        )
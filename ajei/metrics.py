@@ -0,0 +1,402 @@
+import atexit
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Counters and histograms of exited workers, in AJEI_METRICS_DIR
+ARCHIVE_FILE = "archive.json"
+ARCHIVE_LOCK = "archive.lock"
+
+
+def _label_key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(items):
+    if not items:
+        return ""
+    escaped = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in items
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _merge(merged, metrics, gauges=True):
+    """Add the values of one process' metrics to ``merged``"""
+    for name, data in metrics.items():
+        if data["type"] == "gauge" and not gauges:
+            continue
+        target = merged.setdefault(name, {**data, "values": {}})
+        for key, value in data["values"].items():
+            if data["type"] == "histogram":
+                current = target["values"].get(key)
+                if current is None or len(current) != len(value):
+                    target["values"][key] = list(value)
+                else:
+                    target["values"][key] = [a + b for a, b in zip(current, value)]
+            else:
+                target["values"][key] = target["values"].get(key, 0) + value
+    return merged
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = registry.lock
+        self._registry = registry
+        self._values = {}
+        registry.register(self)
+
+    def dump(self):
+        return {"type": self.type, "help": self.documentation, "values": dict(self._values)}
+
+
+class Counter(Metric):
+    """A value that only goes up"""
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._registry.maybe_flush()
+
+    def set_total(self, value, **labels):
+        """Mirror a total that is counted elsewhere (e.g. a cache's stats)"""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Gauge(Metric):
+    """A value that can go up and down"""
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+        self._registry.maybe_flush()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._registry.maybe_flush()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(registry, name, documentation)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            # [count per bucket..., count above the last bucket, sum]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+        self._registry.maybe_flush()
+
+    def dump(self):
+        data = super().dump()
+        data["buckets"] = list(self.buckets)
+        data["values"] = {key: list(state) for key, state in self._values.items()}
+        return data
+
+
+class Registry:
+    """
+    In-process metrics registry exposed in the Prometheus text format.
+
+    Metrics are updated in memory under a lock. When AJEI_METRICS_DIR is set,
+    every process periodically writes its values to ``<dir>/<pid>.json`` and
+    the exposition merges the files of all processes, so the numbers are
+    correct behind a multi-worker WSGI/ASGI server. When the metrics are
+    collected, the counters and histograms of workers that have exited are
+    merged into an archive file (under a file lock) and their files deleted,
+    so the totals never go down; their gauges are dropped.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics = {}
+        self.collectors = []
+        self._last_flush = 0.0
+        # One writer at a time: any metric update may trigger a flush
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def counter(self, name, documentation):
+        return Counter(self, name, documentation)
+
+    def gauge(self, name, documentation):
+        return Gauge(self, name, documentation)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return Histogram(self, name, documentation, buckets)
+
+    def add_collector(self, func):
+        """Register a callable run before each flush/exposition to refresh
+        metrics that mirror state kept elsewhere"""
+        self.collectors.append(func)
+        return func
+
+    # Persistence
+
+    @property
+    def directory(self):
+        return getattr(settings, "AJEI_METRICS_DIR", None)
+
+    def maybe_flush(self):
+        if self.directory is None:
+            return
+        interval = getattr(settings, "AJEI_METRICS_FLUSH_INTERVAL", 5.0)
+        if time.monotonic() - self._last_flush < interval:
+            return
+        # Another thread writing the file is as good as this one doing it
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._last_flush >= interval:
+                self._write()
+        finally:
+            self._flush_lock.release()
+
+    def snapshot(self):
+        for collector in self.collectors:
+            collector()
+        with self.lock:
+            return {name: metric.dump() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        """Write this process' values to its file in AJEI_METRICS_DIR"""
+        if self.directory is None:
+            return
+        with self._flush_lock:
+            self._write()
+
+    def _write(self):
+        # Called with the flush lock held
+        directory = self.directory
+        self._last_flush = time.monotonic()
+        data = json.dumps({"pid": os.getpid(), "metrics": self.snapshot()})
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _process_snapshots(self):
+        directory = self.directory
+        if directory is None:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for filename in os.listdir(directory):
+            if not filename.endswith(".json") or filename == ARCHIVE_FILE:
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if _pid_alive(data.get("pid")):
+                snapshots.append(data["metrics"])
+            else:
+                self._archive(path)
+        # Read last: a file archived meanwhile by another process is in it
+        snapshots.append(self._read_archive())
+        return snapshots
+
+    def _read_archive(self):
+        try:
+            with open(os.path.join(self.directory, ARCHIVE_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _archive(self, path):
+        """
+        Merge the counters and histograms of an exited worker's file into
+        the archive, then delete the file
+        """
+        directory = self.directory
+        with open(os.path.join(directory, ARCHIVE_LOCK), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Another process may have archived it since it was read
+                try:
+                    with open(path) as f:
+                        data = json.load(f)
+                except FileNotFoundError:
+                    return
+                except (OSError, ValueError):
+                    data = {"metrics": {}}
+                archive = _merge(self._read_archive(), data["metrics"], gauges=False)
+                archive_path = os.path.join(directory, ARCHIVE_FILE)
+                tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(archive, f)
+                os.replace(tmp_path, archive_path)
+                os.remove(path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # Exposition
+
+    def collect(self):
+        """Merge the values of all processes"""
+        merged = {}
+        for metrics in self._process_snapshots():
+            _merge(merged, metrics)
+        return merged
+
+    def exposition(self):
+        """Render all metrics in the Prometheus text format (version 0.0.4)"""
+        lines = []
+        for name, data in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            for key, value in sorted(data["values"].items()):
+                items = [tuple(item) for item in json.loads(key)]
+                if data["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(items)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                bounds = list(data["buckets"]) + [math.inf]
+                for bound, count in zip(bounds, value[:-1]):
+                    cumulative += count
+                    labels = _format_labels(items + [("le", _format_value(bound))])
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(items)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(items)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        # Alive, owned by another user
+        return True
+    except (ProcessLookupError, TypeError):
+        return False
+    return True
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+# Project metrics
+
+REQUEST_LATENCY = registry.histogram(
+    "ajei_request_duration_seconds", "Request latency by URL name"
+)
+DB_QUERIES = registry.counter(
+    "ajei_db_queries_total", "Database queries executed, by URL name"
+)
+CONTACT_SUBMISSIONS = registry.counter(
+    "ajei_contact_submissions_total", "Contact form submissions by outcome"
+)
+PAGEVIEW_BUFFER_DEPTH = registry.gauge(
+    "ajei_pageview_buffer_depth", "Page views waiting to be written"
+)
+PAGEVIEWS_DROPPED = registry.counter(
+    "ajei_pageviews_dropped_total",
+    "Page views never written, by reason (overflow of the buffer, error)",
+)
+CACHE_REQUESTS = registry.counter(
+    "ajei_cache_requests_total", "Cache lookups by cache and result (hit/miss)"
+)
+DOWNLOADS = registry.counter(
+    "ajei_downloads_total", "Downloads started, by file"
+)
+LOG_RECORDS_DROPPED = registry.counter(
+    "ajei_log_records_dropped_total",
+    "Log records dropped because the background logging queue was full",
+)
+
+
+def record_cache(cache, hit):
+    """Count a lookup in one of the application caches"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@registry.add_collector
+def _collect_user_agent_cache():
+    from .bots import cache_info
+
+    info = cache_info()
+    CACHE_REQUESTS.set_total(info.hits, cache="user_agent", result="hit")
+    CACHE_REQUESTS.set_total(info.misses, cache="user_agent", result="miss")
+
+
+@registry.add_collector
+def _collect_attribution_cache():
+    from .attribution import cache_info
+
+    info = cache_info()
+    CACHE_REQUESTS.set_total(info.hits, cache="attribution", result="hit")
+    CACHE_REQUESTS.set_total(info.misses, cache="attribution", result="miss")
+
+
+@registry.add_collector
+def _collect_geoip_cache():
+    from .geoip import cache_info
+
+    info = cache_info()
+    CACHE_REQUESTS.set_total(info.hits, cache="geoip", result="hit")
+    CACHE_REQUESTS.set_total(info.misses, cache="geoip", result="miss")
+
+
+@registry.add_collector
+def _collect_log_drops():
+    from .log import dropped_records
+
+    LOG_RECORDS_DROPPED.set_total(dropped_records())
@@ -1,64 +1,320 @@
-from django.utils.deprecation import MiddlewareMixin
+import logging
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.utils import translation
-from .models import PageView
+from . import maintenance
+from .attribution import attribution
+from .bots import is_bot
+from .buffer import buffer as page_view_buffer
+from .events import bus
+from .funnel import record_landing
+from .instrumentation import RequestMetrics, current_metrics, install_template_timing
+from .log import request_context
+from .metrics import DB_QUERIES, REQUEST_LATENCY
+from .sampling import PageViewSampler
+from .translations import CatalogWatcher
+
+logger = logging.getLogger(__name__)
+performance_logger = logging.getLogger("ajei.performance")
+
+
+DEFAULT_SKIP_PATHS = [
+    "/admin/",
+    "/static/",
+    "/media/",
+    "/dashboard/",
+    "/rosetta/",
+    "/accounts/",
+    "/metrics/",
+    "/download/",
+]
+
+# Paths still served in maintenance mode, so staff can sign in and switch it
+# off, and Prometheus keeps scraping
+DEFAULT_MAINTENANCE_EXEMPT_PATHS = [
+    "/admin/",
+    "/accounts/",
+    "/static/",
+    "/metrics/",
+]
+
+DEFAULT_PAGE_TITLES = {
+    "/": "الصفحة الرئيسية",
+    "/ajei/": "صفحة أجيء",
+}
+
 
+def compile_prefix_matcher(prefixes):
+    """
+    Compile a list of path prefixes into a single anchored regex and return
+    its match method (None-returning for every path if the list is empty)
+    """
+    if not prefixes:
+        return lambda path: None
+    alternation = "|".join(re.escape(prefix) for prefix in sorted(set(prefixes)))
+    return re.compile(alternation).match
 
-class PageViewTrackingMiddleware(MiddlewareMixin):
+
+class PageViewTrackingMiddleware:
     """
     Middleware to track page views for analytics
+
+    Everything that depends on settings (excluded paths, page titles, bot and
+    sampling policy) is compiled once when the middleware is instantiated, so
+    untracked requests only pay for a method check, a status check and a
+    single regex match.
     """
 
-    def process_response(self, request, response):
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_excluded = compile_prefix_matcher(
+            getattr(settings, "AJEI_TRACKING_SKIP_PATHS", DEFAULT_SKIP_PATHS)
+        )
+        self.page_titles = dict(
+            getattr(settings, "AJEI_PAGE_TITLES", DEFAULT_PAGE_TITLES)
+        )
+        self.sampler = PageViewSampler.from_settings()
+        self.bot_mode = getattr(settings, "AJEI_BOT_TRACKING", "store")
+        self.bot_sample_rate = getattr(settings, "AJEI_BOT_SAMPLE_RATE", 0.1)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        # Only track successful GET requests (200, or 304 for a returning
+        # visitor whose cached copy is still valid) outside the excluded
+        # paths (admin, static, media, dashboard...)
+        if (
+            request.method == "GET"
+            and response.status_code in (200, 304)
+            and not self.is_excluded(request.path)
+        ):
+            try:
+                self.track(request, response)
+            except Exception:
+                # Never disrupt the user experience
+                logger.exception(
+                    "Error tracking page view", extra=request_context(request)
+                )
+
+        return response
+
+    def track(self, request, response):
         """
-        Track page views after response is generated
+        Record a page view for the request
         """
-        # Only track successful GET requests (200 status)
-        if request.method == "GET" and response.status_code == 200:
-            # Skip admin, static, media, and dashboard pages
-            path = request.path
-            skip_paths = [
-                "/admin/",
-                "/static/",
-                "/media/",
-                "/dashboard/",
-                "/rosetta/",
-                "/accounts/",
-            ]
-
-            if not any(path.startswith(skip_path) for skip_path in skip_paths):
-                try:
-                    # Get client IP
-                    x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-                    if x_forwarded_for:
-                        ip_address = x_forwarded_for.split(",")[0].strip()
-                    else:
-                        ip_address = request.META.get("REMOTE_ADDR")
-
-                    # Get current language
-                    current_language = translation.get_language()
-
-                    # Create page view record
-                    PageView.objects.create(
-                        page_path=path,
-                        page_title=self._get_page_title(path),
-                        ip_address=ip_address,
-                        user_agent=request.META.get("HTTP_USER_AGENT", "")[:500],
-                        referrer=request.META.get("HTTP_REFERER", "")[:500],
-                        session_key=request.session.session_key or "",
-                        language=current_language or "ar",
-                    )
-                except Exception as e:
-                    # Silently fail to not disrupt user experience
-                    print(f"Error tracking page view: {e}")
+        user_agent = request.META.get("HTTP_USER_AGENT", "")[:500]
+        bot = is_bot(user_agent)
 
-        return response
+        # Get client IP
+        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+        if x_forwarded_for:
+            ip_address = x_forwarded_for.split(",")[0].strip()
+        else:
+            ip_address = request.META.get("REMOTE_ADDR")
+
+        path = request.path
+        referrer = request.META.get("HTTP_REFERER", "")[:500]
+        # Normalized once per distinct referrer host and campaign
+        origin = attribution(request.META.get("QUERY_STRING", ""), referrer)
+        language = translation.get_language() or "ar"
+
+        # The live dashboard counts every human view, sampled or not. A
+        # landing is always remembered (in a cookie), but counted into the
+        # funnel from its stored row, with the row's sample weight.
+        landing = False
+        if not bot:
+            bus.page_viewed(ip_address)
+            landing = record_landing(request, response, path, language, origin)
+
+        # Sample under load; kept rows carry the inverse of their sampling
+        # probability as weight
+        weight = self.sampler.sample()
+        if not weight:
+            return
+
+        # Tag crawlers, probes and link previews, and drop them before the
+        # INSERT unless configured to store them
+        if bot:
+            weight *= self._bot_weight()
+            if not weight:
+                return
 
-    def _get_page_title(self, path):
+        # Written in batches, enriched with the location (see ajei.buffer)
+        page_view_buffer.add(
+            page_path=path,
+            page_title=self.page_titles.get(path, path)[:200],
+            ip_address=ip_address,
+            user_agent=user_agent,
+            referrer=referrer,
+            referrer_host=origin.referrer_host,
+            utm_source=origin.source,
+            utm_medium=origin.medium,
+            utm_campaign=origin.campaign,
+            session_key=request.session.session_key or "",
+            language=language,
+            is_bot=bot,
+            is_landing=landing,
+            sample_weight=weight,
+        )
+
+    def _bot_weight(self):
         """
-        Get a friendly page title based on the path
+        Weight of a bot page view according to AJEI_BOT_TRACKING ("store",
+        "sample" or "drop"), 0 meaning it should not be stored
         """
-        titles = {
-            "/": "الصفحة الرئيسية",
-            "/ajei/": "صفحة أجيء",
-        }
-        return titles.get(path, path)
+        if self.bot_mode == "drop":
+            return 0.0
+        if self.bot_mode == "sample":
+            rate = self.bot_sample_rate
+            return 1.0 / rate if random.random() < rate else 0.0
+        return 1.0
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Opt-in per-request instrumentation: query count, SQL time, template
+    render time and total time.
+
+    A fraction of the requests (AJEI_INSTRUMENTATION_SAMPLE_RATE) is
+    instrumented; they get a Server-Timing header (unless AJEI_SERVER_TIMING
+    is False) and are logged to "ajei.performance" when slower than
+    AJEI_SLOW_REQUEST_MS. With a rate of 0 the middleware is not loaded at
+    all. It should come first in MIDDLEWARE so the total covers the others.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "AJEI_INSTRUMENTATION_SAMPLE_RATE", 0.0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.slow_request_ms = getattr(settings, "AJEI_SLOW_REQUEST_MS", 500)
+        self.server_timing = getattr(settings, "AJEI_SERVER_TIMING", True)
+        install_template_timing()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        total_time = metrics.total_time
+        if self.server_timing:
+            response["Server-Timing"] = metrics.server_timing(total_time)
+        if total_time * 1000 >= self.slow_request_ms:
+            match = getattr(request, "resolver_match", None)
+            performance_logger.warning(
+                "Slow request: %s %s took %.1f ms (%d queries, %.1f ms SQL, "
+                "%.1f ms templates)",
+                request.method,
+                request.path,
+                total_time * 1000,
+                metrics.queries,
+                metrics.sql_time * 1000,
+                metrics.template_time * 1000,
+                extra={
+                    "method": request.method,
+                    "path": request.path,
+                    "view": match.view_name if match else "",
+                    "status": response.status_code,
+                    "total_ms": round(total_time * 1000, 1),
+                    "queries": metrics.queries,
+                    "sql_ms": round(metrics.sql_time * 1000, 1),
+                    "template_ms": round(metrics.template_time * 1000, 1),
+                },
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Feed the request latency histogram and the query counter, labelled with
+    the URL name, into the metrics registry (see ajei.metrics). Disabled
+    unless AJEI_METRICS_ENABLED is True.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, "AJEI_METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.view_name if match else "<unresolved>"
+        REQUEST_LATENCY.observe(elapsed, url_name=url_name)
+        if queries[0]:
+            DB_QUERIES.inc(queries[0], url_name=url_name)
+        return response
+
+
+class TranslationReloadMiddleware:
+    """
+    Load translation catalogs recompiled while the server is running (e.g.
+    saved through Rosetta) without restarting the workers. The catalog files
+    are checked at most every AJEI_TRANSLATION_CHECK_INTERVAL seconds (None
+    disables the middleware). It must come before LocaleMiddleware, which
+    activates the reloaded catalog.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        interval = getattr(settings, "AJEI_TRANSLATION_CHECK_INTERVAL", None)
+        if interval is None:
+            raise MiddlewareNotUsed
+        self.watcher = CatalogWatcher(interval)
+
+    def __call__(self, request):
+        self.watcher.check()
+        return self.get_response(request)
+
+
+class MaintenanceModeMiddleware:
+    """
+    Answer 503 with the pre-rendered maintenance page (see ajei.maintenance)
+    while the MAINTENANCE_MODE flag is up, except under
+    AJEI_MAINTENANCE_EXEMPT_PATHS. It comes first in MIDDLEWARE and only
+    stats the flag file, at most every AJEI_MAINTENANCE_CHECK_INTERVAL
+    seconds, so the site keeps answering while the database is locked or
+    down. None disables the middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        interval = getattr(settings, "AJEI_MAINTENANCE_CHECK_INTERVAL", None)
+        if interval is None:
+            raise MiddlewareNotUsed
+        self.state = maintenance.MaintenanceState(interval)
+        self.is_exempt = compile_prefix_matcher(
+            getattr(
+                settings,
+                "AJEI_MAINTENANCE_EXEMPT_PATHS",
+                DEFAULT_MAINTENANCE_EXEMPT_PATHS,
+            )
+        )
+
+    def __call__(self, request):
+        pages = self.state.check()
+        if pages is None or self.is_exempt(request.path):
+            return self.get_response(request)
+        return maintenance.response(request, pages)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0002_pageview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageview',
+            name='is_bot',
+            field=models.BooleanField(default=False, verbose_name='Is Bot'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0003_pageview_is_bot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageview',
+            name='sample_weight',
+            field=models.FloatField(default=1.0, verbose_name='Sample Weight'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0004_pageview_sample_weight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='landed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Landed At'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='landing_language',
+            field=models.CharField(blank=True, max_length=10, verbose_name='Landing Language'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='landing_path',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Landing Path'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='landing_referrer',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Landing Referrer Host'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='session_key',
+            field=models.CharField(blank=True, db_index=True, max_length=40, verbose_name='Session Key'),
+        ),
+        migrations.CreateModel(
+            name='DailyConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('landing_path', models.CharField(blank=True, max_length=200, verbose_name='Landing Path')),
+                ('language', models.CharField(blank=True, max_length=10, verbose_name='Language')),
+                ('referrer_host', models.CharField(blank=True, max_length=255, verbose_name='Referrer Host')),
+                ('visitors', models.PositiveIntegerField(default=0, verbose_name='Visitors')),
+                ('submissions', models.PositiveIntegerField(default=0, verbose_name='Submissions')),
+            ],
+            options={
+                'verbose_name': 'Daily Conversion',
+                'verbose_name_plural': 'Daily Conversions',
+                'ordering': ['-date', 'landing_path'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'landing_path', 'language', 'referrer_host'), name='ajei_dailyconversion_unique')],
+            },
+        ),
+    ]
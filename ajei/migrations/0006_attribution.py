@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0005_funnel'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailyconversion',
+            name='ajei_dailyconversion_unique',
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='utm_campaign',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Campaign'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='utm_medium',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Medium'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='utm_source',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Source'),
+        ),
+        migrations.AddField(
+            model_name='dailyconversion',
+            name='utm_campaign',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Campaign'),
+        ),
+        migrations.AddField(
+            model_name='dailyconversion',
+            name='utm_medium',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Medium'),
+        ),
+        migrations.AddField(
+            model_name='dailyconversion',
+            name='utm_source',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Source'),
+        ),
+        migrations.AddField(
+            model_name='pageview',
+            name='referrer_host',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Referrer Host'),
+        ),
+        migrations.AddField(
+            model_name='pageview',
+            name='utm_campaign',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Campaign'),
+        ),
+        migrations.AddField(
+            model_name='pageview',
+            name='utm_medium',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Medium'),
+        ),
+        migrations.AddField(
+            model_name='pageview',
+            name='utm_source',
+            field=models.CharField(blank=True, max_length=100, verbose_name='UTM Source'),
+        ),
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['utm_campaign', 'status'], name='ajei_contac_utm_cam_b4f61e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyconversion',
+            index=models.Index(fields=['utm_campaign', 'date'], name='ajei_dailyc_utm_cam_c50cc5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['referrer_host', 'viewed_at'], name='ajei_pagevi_referre_66ff49_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['utm_campaign', 'viewed_at'], name='ajei_pagevi_utm_cam_86210e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyconversion',
+            constraint=models.UniqueConstraint(fields=('date', 'landing_path', 'language', 'referrer_host', 'utm_source', 'utm_medium', 'utm_campaign'), name='ajei_dailyconversion_unique'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0006_attribution'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='city',
+            field=models.CharField(blank=True, max_length=100, verbose_name='City'),
+        ),
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='country',
+            field=models.CharField(blank=True, max_length=2, verbose_name='Country'),
+        ),
+        migrations.AddField(
+            model_name='pageview',
+            name='city',
+            field=models.CharField(blank=True, max_length=100, verbose_name='City'),
+        ),
+        migrations.AddField(
+            model_name='pageview',
+            name='country',
+            field=models.CharField(blank=True, max_length=2, verbose_name='Country'),
+        ),
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['country', 'city'], name='ajei_contac_country_964da7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['country', 'viewed_at'], name='ajei_pagevi_country_29d962_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageview',
+            index=models.Index(fields=['city', 'viewed_at'], name='ajei_pagevi_city_c1a887_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0007_geoip'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDownload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('file', models.CharField(max_length=255, verbose_name='File')),
+                ('downloads', models.PositiveIntegerField(default=0, verbose_name='Downloads')),
+            ],
+            options={
+                'verbose_name': 'Daily Download',
+                'verbose_name_plural': 'Daily Downloads',
+                'ordering': ['-date', 'file'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'file'), name='ajei_dailydownload_unique')],
+            },
+        ),
+    ]
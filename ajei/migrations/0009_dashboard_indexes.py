@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+from ajei.indexes import AddIndexOnline, RemoveIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('ajei', '0008_dailydownload'),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='contactsubmission',
+            index=models.Index(fields=['status', '-created_at'], name='ajei_contac_status_a983d4_idx'),
+        ),
+        AddIndexOnline(
+            model_name='contactsubmission',
+            index=models.Index(fields=['investment_type'], name='ajei_contac_investm_ece616_idx'),
+        ),
+        AddIndexOnline(
+            model_name='contactsubmission',
+            index=models.Index(fields=['updated_at'], name='ajei_contac_updated_d5b313_idx'),
+        ),
+        AddIndexOnline(
+            model_name='pageview',
+            index=models.Index(condition=models.Q(('is_bot', False)), fields=['viewed_at', 'sample_weight', 'ip_address', 'country', 'city', 'is_bot'], name='ajei_pageview_human_time'),
+        ),
+        AddIndexOnline(
+            model_name='pageview',
+            index=models.Index(condition=models.Q(('is_bot', False)), fields=['page_path', 'sample_weight', 'is_bot'], name='ajei_pageview_human_path'),
+        ),
+        AddIndexOnline(
+            model_name='pageview',
+            index=models.Index(condition=models.Q(('is_bot', False)), fields=['language', 'sample_weight', 'is_bot'], name='ajei_pageview_human_lang'),
+        ),
+        # The indexes above replace these
+        RemoveIndexOnline(
+            model_name='contactsubmission',
+            name='ajei_contac_status_2448b4_idx',
+        ),
+        RemoveIndexOnline(
+            model_name='pageview',
+            name='ajei_pagevi_ip_addr_ce8f1d_idx',
+        ),
+        RemoveIndexOnline(
+            model_name='pageview',
+            name='ajei_pagevi_country_29d962_idx',
+        ),
+        RemoveIndexOnline(
+            model_name='pageview',
+            name='ajei_pagevi_city_c1a887_idx',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+def mark_landings(apps, schema_editor):
+    # Before the landing cookie, a visitor's first view was tracked before
+    # its session existed: keep counting those as the landings of old rows
+    PageView = apps.get_model('ajei', 'PageView')
+    PageView.objects.filter(is_bot=False, session_key='').update(is_landing=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0009_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageview',
+            name='is_landing',
+            field=models.BooleanField(default=False, verbose_name='Is Landing'),
+        ),
+        migrations.RunPython(mark_landings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ajei', '0010_pageview_is_landing'),
+    ]
+
+    operations = [
+        # Only the Python-side default changes (auto_now_add -> default): no
+        # need for SQLite to rebuild the page view table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='pageview',
+                    name='viewed_at',
+                    field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Viewed At'),
+                ),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -49,6 +50,26 @@ class ContactSubmission(models.Model):
     user_agent = models.TextField(_("User Agent"), blank=True)
     referrer = models.URLField(_("Referrer URL"), blank=True, max_length=500)
 
+    # Funnel: the visitor's session and where it landed (see ajei.funnel)
+    session_key = models.CharField(
+        _("Session Key"), max_length=40, blank=True, db_index=True
+    )
+    landing_path = models.CharField(_("Landing Path"), max_length=200, blank=True)
+    landing_language = models.CharField(_("Landing Language"), max_length=10, blank=True)
+    landing_referrer = models.CharField(
+        _("Landing Referrer Host"), max_length=255, blank=True
+    )
+    landed_at = models.DateTimeField(_("Landed At"), null=True, blank=True)
+
+    # Campaign attribution of the landing (see ajei.attribution)
+    utm_source = models.CharField(_("UTM Source"), max_length=100, blank=True)
+    utm_medium = models.CharField(_("UTM Medium"), max_length=100, blank=True)
+    utm_campaign = models.CharField(_("UTM Campaign"), max_length=100, blank=True)
+
+    # Location of the IP address, when a GeoIP database is configured
+    country = models.CharField(_("Country"), max_length=2, blank=True)
+    city = models.CharField(_("City"), max_length=100, blank=True)
+
     # Timestamps
     created_at = models.DateTimeField(_("Submitted At"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Last Updated"), auto_now=True)
@@ -60,8 +81,13 @@ class ContactSubmission(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["-created_at"]),
-            models.Index(fields=["status"]),
+            # Status filter of the contact list, already in list order
+            models.Index(fields=["status", "-created_at"]),
             models.Index(fields=["email"]),
+            models.Index(fields=["investment_type"]),
+            models.Index(fields=["updated_at"]),
+            models.Index(fields=["utm_campaign", "status"]),
+            models.Index(fields=["country", "city"]),
         ]
 
     def __str__(self):
@@ -82,9 +108,19 @@ class PageView(models.Model):
     ip_address = models.GenericIPAddressField(_("IP Address"), null=True, blank=True)
     user_agent = models.TextField(_("User Agent"), blank=True)
     referrer = models.URLField(_("Referrer URL"), blank=True, max_length=500)
+    referrer_host = models.CharField(_("Referrer Host"), max_length=255, blank=True)
+    utm_source = models.CharField(_("UTM Source"), max_length=100, blank=True)
+    utm_medium = models.CharField(_("UTM Medium"), max_length=100, blank=True)
+    utm_campaign = models.CharField(_("UTM Campaign"), max_length=100, blank=True)
     session_key = models.CharField(_("Session Key"), max_length=100, blank=True)
     language = models.CharField(_("Language"), max_length=10, blank=True)
-    viewed_at = models.DateTimeField(_("Viewed At"), auto_now_add=True, db_index=True)
+    country = models.CharField(_("Country"), max_length=2, blank=True)
+    city = models.CharField(_("City"), max_length=100, blank=True)
+    is_bot = models.BooleanField(_("Is Bot"), default=False)
+    # First tracked view of a visitor (see ajei.funnel)
+    is_landing = models.BooleanField(_("Is Landing"), default=False)
+    sample_weight = models.FloatField(_("Sample Weight"), default=1.0)
+    viewed_at = models.DateTimeField(_("Viewed At"), default=timezone.now, db_index=True)
 
     class Meta:
         verbose_name = _("Page View")
@@ -93,8 +129,106 @@ class PageView(models.Model):
         indexes = [
             models.Index(fields=["-viewed_at"]),
             models.Index(fields=["page_path"]),
-            models.Index(fields=["ip_address"]),
+            models.Index(fields=["referrer_host", "viewed_at"]),
+            models.Index(fields=["utm_campaign", "viewed_at"]),
+            # The dashboard only counts human views: partial indexes over
+            # them, holding every column its queries read so they are
+            # answered from the index alone (is_bot is in the key for SQLite,
+            # which otherwise doesn't treat a partial index as covering)
+            models.Index(
+                fields=[
+                    "viewed_at",
+                    "sample_weight",
+                    "ip_address",
+                    "country",
+                    "city",
+                    "is_bot",
+                ],
+                condition=models.Q(is_bot=False),
+                name="ajei_pageview_human_time",
+            ),
+            models.Index(
+                fields=["page_path", "sample_weight", "is_bot"],
+                condition=models.Q(is_bot=False),
+                name="ajei_pageview_human_path",
+            ),
+            models.Index(
+                fields=["language", "sample_weight", "is_bot"],
+                condition=models.Q(is_bot=False),
+                name="ajei_pageview_human_lang",
+            ),
         ]
 
     def __str__(self):
         return f"{self.page_path} - {self.viewed_at}"
+
+
+class DailyConversion(models.Model):
+    """
+    Visitors and contact submissions per day, landing page, language,
+    referrer host and campaign. Kept up to date at ingest by ajei.funnel and
+    rebuilt from the raw tables by the rebuild_conversions command.
+    """
+
+    date = models.DateField(_("Date"))
+    landing_path = models.CharField(_("Landing Path"), max_length=200, blank=True)
+    language = models.CharField(_("Language"), max_length=10, blank=True)
+    referrer_host = models.CharField(_("Referrer Host"), max_length=255, blank=True)
+    utm_source = models.CharField(_("UTM Source"), max_length=100, blank=True)
+    utm_medium = models.CharField(_("UTM Medium"), max_length=100, blank=True)
+    utm_campaign = models.CharField(_("UTM Campaign"), max_length=100, blank=True)
+    visitors = models.PositiveIntegerField(_("Visitors"), default=0)
+    submissions = models.PositiveIntegerField(_("Submissions"), default=0)
+
+    class Meta:
+        verbose_name = _("Daily Conversion")
+        verbose_name_plural = _("Daily Conversions")
+        ordering = ["-date", "landing_path"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "date",
+                    "landing_path",
+                    "language",
+                    "referrer_host",
+                    "utm_source",
+                    "utm_medium",
+                    "utm_campaign",
+                ],
+                name="ajei_dailyconversion_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["utm_campaign", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.landing_path} ({self.language})"
+
+    @property
+    def conversion_rate(self):
+        """Submissions per 100 visitors"""
+        return 100 * self.submissions / self.visitors if self.visitors else 0
+
+
+class DailyDownload(models.Model):
+    """
+    Number of downloads started per day and file (see ajei.downloads)
+    """
+
+    date = models.DateField(_("Date"))
+    file = models.CharField(_("File"), max_length=255)
+    downloads = models.PositiveIntegerField(_("Downloads"), default=0)
+
+    class Meta:
+        verbose_name = _("Daily Download")
+        verbose_name_plural = _("Daily Downloads")
+        ordering = ["-date", "file"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "file"], name="ajei_dailydownload_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.file}: {self.downloads}"
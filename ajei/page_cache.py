@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from .metrics import record_cache
+from .versions import catalog_version, get_version, template_version
+
+
+# Rendered in place of the per-visitor parts of a cached page
+CSRF_PLACEHOLDER = "__ajei_csrf_token__"
+MESSAGES_START = "<!--ajei:messages-->"
+MESSAGES_END = "<!--/ajei:messages-->"
+MESSAGES_TEMPLATE = "landing_page/includes/messages.html"
+
+
+def page_version(template_name):
+    """
+    Everything a landing page depends on besides the visitor: the template,
+    the language, the dynamic settings and the translation catalogs
+    """
+    return "|".join(
+        [
+            template_name,
+            str(template_version(template_name)),
+            translation.get_language() or "",
+            str(get_version("constance")),
+            str(catalog_version()),
+        ]
+    )
+
+
+def fragment_context(template_name):
+    """
+    Context for the {% cache %} fragments of a landing page: they only
+    depend on the template and the translations, so they survive changes to
+    the dynamic settings that invalidate the page shell
+    """
+    return {
+        "fragment_version": f"{template_version(template_name)}.{catalog_version()}",
+        "fragment_timeout": getattr(settings, "AJEI_FRAGMENT_CACHE_TIMEOUT", 0),
+    }
+
+
+def page_shell(request, template_name, context):
+    """
+    The page rendered once for everyone, with placeholders instead of the
+    CSRF token and the flash messages, cached for AJEI_PAGE_CACHE_TIMEOUT
+    seconds (0 disables the cache)
+    """
+    timeout = getattr(settings, "AJEI_PAGE_CACHE_TIMEOUT", 0)
+    key = f"ajei:page:{page_version(template_name)}"
+    shell = cache.get(key) if timeout else None
+    if timeout:
+        record_cache("page", shell is not None)
+    if shell is None:
+        shell = render_to_string(
+            template_name,
+            {**context, "csrf_token": CSRF_PLACEHOLDER, "messages": ()},
+            request=request,
+        )
+        if timeout:
+            cache.set(key, shell, timeout)
+    return shell
+
+
+def personalize(request, shell):
+    """
+    Splice the visitor's CSRF token and flash messages into a page shell
+    """
+    html = shell.replace(CSRF_PLACEHOLDER, get_token(request))
+    storage = messages.get_messages(request)
+    if len(storage):
+        before, _, rest = html.partition(MESSAGES_START)
+        _, _, after = rest.partition(MESSAGES_END)
+        html = "".join(
+            [before, render_to_string(MESSAGES_TEMPLATE, {"messages": storage}), after]
+        )
+    return html
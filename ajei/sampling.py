@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+
+
+class PageViewSampler:
+    """
+    Decide which page views get written, and with which weight.
+
+    Modes (AJEI_PAGEVIEW_SAMPLING):
+    - "off": record every page view with weight 1
+    - "fixed": record AJEI_PAGEVIEW_SAMPLE_RATE of them
+    - "adaptive": keep roughly AJEI_PAGEVIEW_TARGET_RPS writes per second per
+      process, lowering the rate as traffic goes up
+
+    A kept page view carries the weight 1 / rate, so summing the weights gives
+    an unbiased estimate of the real number of views.
+    """
+
+    def __init__(self, mode="off", rate=1.0, target_rps=20, window=5.0, min_rate=0.01):
+        self.mode = mode
+        self.fixed_rate = max(min(rate, 1.0), min_rate)
+        self.target_rps = target_rps
+        self.window = window
+        self.min_rate = min_rate
+
+        self._lock = threading.Lock()
+        self._rate = 1.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            mode=getattr(settings, "AJEI_PAGEVIEW_SAMPLING", "off"),
+            rate=getattr(settings, "AJEI_PAGEVIEW_SAMPLE_RATE", 1.0),
+            target_rps=getattr(settings, "AJEI_PAGEVIEW_TARGET_RPS", 20),
+            window=getattr(settings, "AJEI_PAGEVIEW_SAMPLE_WINDOW", 5.0),
+        )
+
+    @property
+    def rate(self):
+        """Current sampling rate"""
+        if self.mode == "fixed":
+            return self.fixed_rate
+        if self.mode == "adaptive":
+            return self._rate
+        return 1.0
+
+    def sample(self):
+        """
+        Return the weight to store for this page view, or 0 if it should be
+        skipped
+        """
+        if self.mode == "adaptive":
+            self._observe()
+        rate = self.rate
+        if rate >= 1.0:
+            return 1.0
+        if random.random() < rate:
+            return 1.0 / rate
+        return 0.0
+
+    def _observe(self):
+        """
+        Count the request and, once per window, derive the rate for the next
+        window from the observed request rate
+        """
+        with self._lock:
+            self._window_count += 1
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed < self.window:
+                return
+            observed_rps = self._window_count / elapsed
+            if observed_rps <= self.target_rps:
+                self._rate = 1.0
+            else:
+                self._rate = max(self.target_rps / observed_rps, self.min_rate)
+            self._window_start = now
+            self._window_count = 0
@@ -0,0 +1,36 @@
+from constance.signals import config_updated
+from django.dispatch import receiver
+from rosetta.signals import post_save as rosetta_post_save
+
+from . import maintenance
+from .translations import compile_catalogs, reload_catalogs
+from .versions import bump_version
+
+
+@receiver(config_updated)
+def constance_updated(sender, key, old_value, new_value, **kwargs):
+    """
+    Invalidate pages that depend on the dynamic settings, and switch
+    maintenance mode on or off (re-rendering its pages if a setting they show
+    changes while it is on)
+    """
+    bump_version("constance")
+    if key == "MAINTENANCE_MODE":
+        if new_value:
+            maintenance.enable()
+        else:
+            maintenance.disable()
+    elif key in maintenance.CONFIG_KEYS and maintenance.is_enabled():
+        maintenance.enable()
+
+
+@receiver(rosetta_post_save)
+def translations_saved(sender, language_code, request, **kwargs):
+    """
+    Compile the catalog saved through Rosetta (unless ROSETTA_AUTO_COMPILE
+    already did) and use it in this worker right away. The other workers
+    notice the new file (TranslationReloadMiddleware) and the page caches are
+    keyed on the catalogs' modification time.
+    """
+    compile_catalogs([language_code])
+    reload_catalogs()
@@ -1,3 +1,596 @@
-from django.test import TestCase
+import atexit
+import json
+import logging
+import re
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import attribution, funnel, maintenance, page_cache, widgets
+from .buffer import PageViewBuffer
+from .log import BackgroundHandler
+from .metrics import PAGEVIEWS_DROPPED, Registry, _pid_alive, registry
+from .cleanup import CleanupState, OldPageViews, prune
+from .models import ContactSubmission, DailyConversion, PageView
+
+
+# "SCAN <table>" without "USING [COVERING] INDEX" reads every row of the
+# table. Searches, and scans of an index, are fine.
+SCAN_RE = re.compile(r"^SCAN (\w+)(?: AS \w+)?( USING (COVERING )?INDEX)?")
+
+# Tables whose scans must read the index alone: walking the page views in
+# index order and fetching each row is as slow as a full scan
+COVERED_TABLES = {"ajei_pageview"}
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite's")
+@override_settings(AJEI_PAGEVIEW_BUFFER_SIZE=0, AJEI_DASHBOARD_WIDGET_TTL=0)
+class QueryPlanTests(TestCase):
+    """
+    Every query of the dashboard and the contact list must be answered from
+    an index: each one is run through EXPLAIN QUERY PLAN and the test fails
+    on a full table scan. The search box of the contact list (LIKE
+    '%term%') is the exception, no index can help it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        now = timezone.now()
+        for day in range(3):
+            for path, language, is_bot in [
+                ("/", "en", False),
+                ("/ar/", "ar", False),
+                ("/", "", True),
+            ]:
+                PageView.objects.create(
+                    page_path=path,
+                    language=language,
+                    ip_address=f"192.0.2.{day}",
+                    is_bot=is_bot,
+                    country="EG",
+                    city="Cairo",
+                )
+        PageView.objects.update(viewed_at=now - timedelta(hours=1))
+        for status in ["new", "contacted", "qualified"]:
+            ContactSubmission.objects.create(
+                name="Test",
+                email=f"{status}@example.com",
+                phone="0100000000",
+                investment_type="medical",
+                status=status,
+                utm_source="google",
+                utm_campaign="launch",
+                country="EG",
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def query_plans(self, url):
+        """(sql, plan lines) of each SELECT run while answering ``url``"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT"):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plans.append((sql, [row[3] for row in cursor.fetchall()]))
+        return plans
+
+    def assertNoFullScans(self, url):
+        plans = self.query_plans(url)
+        self.assertTrue(plans)
+        for sql, plan in plans:
+            for line in plan:
+                match = SCAN_RE.match(line)
+                if not match or match.group(1) == "subquery":
+                    continue
+                table, index, covering = match.groups()
+                if not index or (table in COVERED_TABLES and not covering):
+                    self.fail(f"{url}: full scan of {table}\n{sql}\n{plan}")
+        return plans
+
+    def test_dashboard(self):
+        self.assertNoFullScans(reverse("admin_dashboard"))
+
+    def test_dashboard_stats(self):
+        self.assertNoFullScans(reverse("dashboard_stats"))
+
+    def test_contact_list(self):
+        self.assertNoFullScans(reverse("contact_list"))
+
+    def test_contact_list_by_status(self):
+        plans = self.assertNoFullScans(reverse("contact_list") + "?status=new")
+        # The (status, -created_at) index also gives the list order
+        for sql, plan in plans:
+            if "ORDER BY" in sql:
+                self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan, sql)
+
+
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+@override_settings(AJEI_PAGEVIEW_BUFFER_SIZE=0, AJEI_PAGE_CACHE_TIMEOUT=3600)
+class LandingPageCsrfTests(TestCase):
+    """
+    The landing page is rendered once and cached; each visitor's CSRF token
+    is spliced into the cached copy and must still pass the contact form's
+    CSRF check
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def visitor(self):
+        return Client(enforce_csrf_checks=True, HTTP_USER_AGENT="Mozilla/5.0")
+
+    def form_token(self, response):
+        self.assertEqual(response.status_code, 200)
+        match = CSRF_INPUT_RE.search(response.content.decode())
+        self.assertIsNotNone(match)
+        self.assertNotEqual(match.group(1), page_cache.CSRF_PLACEHOLDER)
+        return match.group(1)
+
+    def test_cached_page_token_passes_csrf_check(self):
+        client = self.visitor()
+        with mock.patch.object(
+            page_cache, "render_to_string", wraps=page_cache.render_to_string
+        ) as render:
+            self.form_token(client.get(reverse("landing_page")))
+            token = self.form_token(client.get(reverse("landing_page")))
+        rendered = [
+            call
+            for call in render.call_args_list
+            if call.args[0] == "landing_page/ajei_landing.html"
+        ]
+        self.assertEqual(len(rendered), 1, "the second visit wasn't served from cache")
+        self.assertIn(settings.CSRF_COOKIE_NAME, client.cookies)
+
+        response = client.post(
+            reverse("ajei_contact_submit"),
+            {
+                "csrfmiddlewaretoken": token,
+                "name": "Test",
+                "email": "test@example.com",
+                "phone": "0100000000",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            ContactSubmission.objects.filter(email="test@example.com").exists()
+        )
+
+    def test_post_without_token_is_rejected(self):
+        client = self.visitor()
+        client.get(reverse("landing_page"))
+        response = client.post(
+            reverse("ajei_contact_submit"),
+            {"name": "Test", "email": "test@example.com", "phone": "0100000000"},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_visitors_get_their_own_token(self):
+        first, second = self.visitor(), self.visitor()
+        first_token = self.form_token(first.get(reverse("landing_page")))
+        second_token = self.form_token(second.get(reverse("landing_page")))
+        self.assertNotEqual(first_token, second_token)
+        self.assertNotEqual(
+            first.cookies[settings.CSRF_COOKIE_NAME].value,
+            second.cookies[settings.CSRF_COOKIE_NAME].value,
+        )
+        # A token only works with its own visitor's cookie
+        response = second.post(
+            reverse("ajei_contact_submit"),
+            {
+                "csrfmiddlewaretoken": first_token,
+                "name": "Test",
+                "email": "test@example.com",
+                "phone": "0100000000",
+            },
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class DashboardEventsTests(TestCase):
+    def test_wsgi_request_gets_no_stream(self):
+        # The test client is a WSGI handler: the endless stream would be
+        # buffered in full, so it's refused and the dashboard polls instead
+        user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(user)
+        response = self.client.get(reverse("dashboard_events"))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+
+@override_settings(AJEI_PAGEVIEW_BUFFER_SIZE=0, AJEI_BOT_TRACKING="store")
+class FunnelTests(TestCase):
+    """
+    Landings are counted into the conversion rollup as their page views are
+    written, and rebuild_conversions must arrive at the same rows
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def visitor(self):
+        return Client(HTTP_USER_AGENT="Mozilla/5.0")
+
+    def rollup(self):
+        return sorted(
+            DailyConversion.objects.values_list(
+                "date",
+                "landing_path",
+                "language",
+                "referrer_host",
+                "utm_source",
+                "utm_medium",
+                "utm_campaign",
+                "visitors",
+                "submissions",
+            )
+        )
+
+    def test_landing_creates_no_session(self):
+        client = self.visitor()
+        client.get(reverse("landing_page"))
+        client.get(reverse("landing_page"))
+        self.assertIn(funnel.COOKIE_NAME, client.cookies)
+        self.assertEqual(Session.objects.count(), 0)
+        self.assertEqual(PageView.objects.filter(is_landing=True).count(), 1)
+
+    def test_live_counts_match_rebuild(self):
+        returning = self.visitor()
+        returning.get(reverse("landing_page"))
+        returning.get(reverse("landing_page") + "?lang=en", follow=True)
+        # Switching the language first creates a session before the landing
+        self.visitor().get(reverse("landing_page") + "?lang=ar", follow=True)
+        lead = self.visitor()
+        lead.get(reverse("landing_page") + "?utm_source=google&utm_campaign=launch")
+        lead.post(
+            reverse("ajei_contact_submit"),
+            {"name": "Test", "email": "test@example.com", "phone": "0100000000"},
+        )
+        Client(HTTP_USER_AGENT="Googlebot/2.1").get(reverse("landing_page"))
+
+        live = self.rollup()
+        self.assertEqual(sum(row[-2] for row in live), 3)
+        self.assertEqual(sum(row[-1] for row in live), 1)
+        self.assertIn("launch", [row[6] for row in live])
+        call_command("rebuild_conversions", stdout=StringIO())
+        self.assertEqual(self.rollup(), live)
+
+
+@override_settings(AJEI_PAGEVIEW_BUFFER_SIZE=0, AJEI_MAINTENANCE_CHECK_INTERVAL=0)
+class MaintenanceModeTests(TestCase):
+    """
+    With the flag up, public pages get the pre-rendered 503 without touching
+    the database, and the exempt paths keep working
+    """
+
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        state = self.settings(AJEI_STATE_DIR=Path(state_dir.name))
+        state.enable()
+        self.addCleanup(state.disable)
+        maintenance.enable()
+
+    def test_public_page_is_503_without_queries(self):
+        for language in ["en", "ar"]:
+            with self.assertNumQueries(0), self.assertNoLogs("django.request"):
+                response = Client().get(
+                    reverse("landing_page"), HTTP_ACCEPT_LANGUAGE=language
+                )
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(
+                response["Retry-After"],
+                str(getattr(settings, "AJEI_MAINTENANCE_RETRY_AFTER", 600)),
+            )
+            self.assertEqual(response["Content-Language"], language)
+            self.assertContains(response, f'lang="{language}"', status_code=503)
+
+    def test_admin_is_exempt(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse("admin:index")).status_code, 200)
+
+    def test_metrics_is_exempt(self):
+        response = Client().get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_flag_follows_setting_at_boot(self):
+        # A fresh AJEI_STATE_DIR with the setting on
+        maintenance.disable()
+        for page in ["en", "ar"]:
+            maintenance.page_path(page).unlink()
+        with mock.patch.object(maintenance, "config", MAINTENANCE_MODE=True):
+            maintenance.sync()
+        self.assertTrue(maintenance.is_enabled())
+        self.assertTrue(maintenance.page_path("ar").exists())
+
+    def test_unreadable_setting_keeps_the_flag(self):
+        config = mock.Mock()
+        type(config).MAINTENANCE_MODE = mock.PropertyMock(side_effect=OperationalError)
+        maintenance.disable()
+        with mock.patch.object(maintenance, "config", config):
+            maintenance.sync()
+        self.assertFalse(maintenance.is_enabled())
+
+    def test_disabled(self):
+        maintenance.disable()
+        response = Client(HTTP_USER_AGENT="Mozilla/5.0").get(reverse("landing_page"))
+        self.assertEqual(response.status_code, 200)
+
+
+class CleanupTests(TestCase):
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.state_path = Path(state_dir.name) / "cleanup.json"
+        old = timezone.now() - timedelta(days=40)
+        for is_bot in [True] * 5 + [False, False]:
+            PageView.objects.create(page_path="/", is_bot=is_bot)
+        PageView.objects.update(viewed_at=old)
+        PageView.objects.create(page_path="/", is_bot=True)
+
+    def test_resume_after_deadline(self):
+        task = OldPageViews("bot_pageviews", 30, bots_only=True)
+        old_bots = list(
+            PageView.objects.filter(
+                is_bot=True, viewed_at__lt=timezone.now() - timedelta(days=30)
+            )
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        # The deadline passes after the first batch
+        clock = iter([0.0, 1.0]).__next__
+        deleted, finished = prune(
+            task, CleanupState(self.state_path), 2, deadline=0.5, clock=clock
+        )
+        self.assertEqual((deleted, finished), (2, False))
+        self.assertFalse(PageView.objects.filter(id__in=old_bots[:2]).exists())
+
+        # The next run starts after the saved cursor
+        state = CleanupState(self.state_path)
+        self.assertEqual(state.get(task.name), old_bots[1])
+        with CaptureQueriesContext(connection) as queries:
+            deleted, finished = prune(task, state, 2)
+        self.assertEqual((deleted, finished), (3, True))
+        self.assertTrue(
+            any(
+                f'"id" > {old_bots[1]}' in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+        self.assertIsNone(CleanupState(self.state_path).get(task.name))
+        # Recent bots and old human views are kept
+        self.assertEqual(PageView.objects.filter(is_bot=False).count(), 2)
+        self.assertEqual(PageView.objects.filter(is_bot=True).count(), 1)
+
+
+@override_settings(AJEI_DASHBOARD_WIDGET_TTL=60, AJEI_DASHBOARD_WIDGET_WAIT=0.2)
+class WidgetCacheTests(TestCase):
+    """Stale-while-revalidate serving of the dashboard widgets"""
+
+    def setUp(self):
+        cache.clear()
+        registry = mock.patch.dict(widgets._widgets, clear=True)
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def register(self, name, function):
+        widgets.widget(name)(function)
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        self.register("counts", lambda: {"count": 2})
+        cache.set(widgets._cache_key("counts"), (time.time() - 120, {"count": 1}))
+        executor = mock.Mock()
+        with mock.patch.object(widgets, "_executor_for_process", return_value=executor):
+            for _ in range(3):
+                context, missing = widgets.get_widgets()
+                self.assertEqual((context, missing), ({"count": 1}, []))
+        # The cache.add lock lets a single refresh through
+        executor.submit.assert_called_once_with(widgets._refresh, "counts")
+
+    def test_cold_cache_waits_at_most_the_limit(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow():
+            release.wait(5)
+            return {"slow": True}
+
+        self.register("fast", lambda: {"fast": True})
+        self.register("slow", slow)
+        started = time.monotonic()
+        context, missing = widgets.get_widgets()
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual((context, missing), ({"fast": True}, ["slow"]))
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while cache.get(widgets._lock_key("slow")) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(widgets.get_widgets(), ({"fast": True, "slow": True}, []))
+
+    @override_settings(AJEI_DASHBOARD_WIDGET_RETRY_AFTER=60)
+    def test_failing_widget_backs_off(self):
+        def broken():
+            raise ValueError("broken")
+
+        self.register("broken", broken)
+        executor = mock.Mock()
+        executor.submit.side_effect = lambda function, *args: function(*args)
+        with mock.patch.object(
+            widgets, "_executor_for_process", return_value=executor
+        ), mock.patch.object(widgets, "connections"):
+            with self.assertLogs("ajei.widgets", "ERROR"):
+                self.assertEqual(widgets.get_widgets(wait=0), ({}, ["broken"]))
+            # The lock is kept: the next loads don't run the query again
+            self.assertTrue(cache.get(widgets._lock_key("broken")))
+            self.assertEqual(widgets.get_widgets(wait=0), ({}, ["broken"]))
+            self.assertEqual(executor.submit.call_count, 1)
+            # After the backoff, a load retries it
+            cache.delete(widgets._lock_key("broken"))
+            with self.assertLogs("ajei.widgets", "ERROR"):
+                widgets.get_widgets(wait=0)
+        self.assertEqual(executor.submit.call_count, 2)
+
+
+class MetricsArchiveTests(unittest.TestCase):
+    """
+    The counters and histograms of exited workers stay in the totals; their
+    gauges are dropped
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        override = override_settings(AJEI_METRICS_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def worker(self):
+        registry = Registry()
+        registry.counter("requests_total", "Requests").inc(3)
+        registry.gauge("depth", "Depth").set(7)
+        registry.histogram("latency", "Latency", buckets=(1,)).observe(0.5)
+        return registry
+
+    def test_exited_worker_is_archived(self):
+        self.worker().flush()
+        # Make the file look like an exited worker's
+        (path,) = self.directory.glob("*.json")
+        data = json.loads(path.read_text())
+        data["pid"] = 2**22 + 1
+        path.unlink()
+        (self.directory / f"{data['pid']}.json").write_text(json.dumps(data))
+
+        live = Registry()
+        live.counter("requests_total", "Requests").inc(1)
+        for _ in range(2):
+            merged = live.collect()
+            self.assertEqual(merged["requests_total"]["values"]["[]"], 4)
+            self.assertEqual(merged["latency"]["values"]["[]"], [1, 0, 0.5])
+            self.assertNotIn("depth", merged)
+        self.assertFalse((self.directory / f"{data['pid']}.json").exists())
+        self.assertTrue((self.directory / "archive.json").exists())
+
+    def test_pid_of_another_user_is_alive(self):
+        with mock.patch("ajei.metrics.os.kill", side_effect=PermissionError):
+            self.assertTrue(_pid_alive(1))
+
+
+@override_settings(AJEI_PAGEVIEW_BUFFER_SIZE=100, AJEI_PAGEVIEW_BUFFER_MAX_ROWS=3)
+class PageViewBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = PageViewBuffer()
+        # No writer thread: the tests write the batches themselves
+        writer = mock.patch.object(self.buffer, "_ensure_writer")
+        writer.start()
+        self.addCleanup(writer.stop)
+
+    def dropped(self, reason):
+        return PAGEVIEWS_DROPPED._values.get(f'[["reason", "{reason}"]]', 0)
+
+    def test_viewed_at_is_the_time_of_the_view(self):
+        before = timezone.now()
+        self.buffer.add(page_path="/")
+        self.assertTrue(before <= self.buffer._rows[0]["viewed_at"] <= timezone.now())
+
+    def test_queue_is_capped(self):
+        dropped = self.dropped("overflow")
+        for _ in range(5):
+            self.buffer.add(page_path="/")
+        self.assertEqual(len(self.buffer._rows), 3)
+        self.assertEqual(self.dropped("overflow"), dropped + 2)
+
+    def test_bad_row_doesnt_lose_the_batch(self):
+        dropped = self.dropped("error")
+        with self.assertLogs("ajei.buffer", "ERROR"):
+            self.buffer.write(
+                [
+                    {"page_path": "/", "viewed_at": timezone.now()},
+                    {"page_path": None, "viewed_at": timezone.now()},
+                    {"page_path": "/ar/", "viewed_at": timezone.now()},
+                ]
+            )
+        self.assertEqual(
+            sorted(PageView.objects.values_list("page_path", flat=True)), ["/", "/ar/"]
+        )
+        self.assertEqual(self.dropped("error"), dropped + 1)
+
+    def test_unavailable_database_requeues_the_batch(self):
+        rows = [{"page_path": "/", "viewed_at": timezone.now()}]
+        with mock.patch.object(
+            PageView.objects, "bulk_create", side_effect=OperationalError("locked")
+        ), self.assertLogs("ajei.buffer", "ERROR"):
+            self.buffer.write(rows)
+        self.assertEqual(self.buffer._rows, rows)
+        self.buffer.flush()
+        self.assertEqual(PageView.objects.count(), 1)
+
+
+class AttributionTests(unittest.TestCase):
+    def setUp(self):
+        attribution.cache_clear()
+
+    def test_click_ids_share_a_cache_entry(self):
+        for click in range(3):
+            origin = attribution.attribution(
+                f"utm_source=Google&utm_campaign=launch&gclid=abc{click}",
+                "https://www.google.com/",
+            )
+            self.assertEqual(
+                origin, attribution.Attribution("google.com", "google", "", "launch")
+            )
+        info = attribution.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+    def test_gclid_only_is_google_cpc(self):
+        self.assertEqual(
+            attribution.attribution("gclid=xyz", ""),
+            attribution.Attribution("", "google", "cpc", ""),
+        )
+
+    def test_referrer_utm_is_the_fallback(self):
+        self.assertEqual(
+            attribution.attribution("lang=en", "https://example.com/?utm_source=news"),
+            attribution.Attribution("example.com", "news", "", ""),
+        )
+
+
+class LogDropTests(unittest.TestCase):
+    def test_dropped_records_are_exported(self):
+        handler = BackgroundHandler(stream=StringIO(), queue_size=1)
+        # Nothing drains the queue: the first record fills it
+        handler.listener.stop()
+        atexit.unregister(handler.listener.stop)
+        before = registry.collect()["ajei_log_records_dropped_total"]["values"]["[]"]
+        record = logging.LogRecord("ajei", logging.ERROR, "", 0, "full", None, None)
+        for _ in range(3):
+            handler.handle(record)
+        after = registry.collect()["ajei_log_records_dropped_total"]["values"]["[]"]
+        self.assertEqual(after - before, 2)
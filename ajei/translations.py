@@ -0,0 +1,109 @@
+import gettext
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import polib
+from django.conf import settings
+from django.utils.translation import trans_real
+
+from .versions import catalog_version
+
+
+logger = logging.getLogger(__name__)
+
+
+def catalog_paths(languages=None):
+    """(.po, .mo) paths of the project catalogs in LOCALE_PATHS"""
+    codes = languages or [code for code, _ in settings.LANGUAGES]
+    for locale_path in settings.LOCALE_PATHS:
+        for code in codes:
+            messages = Path(locale_path) / code / "LC_MESSAGES"
+            yield messages / "django.po", messages / "django.mo"
+
+
+def compile_catalogs(languages=None):
+    """
+    Compile the .po catalogs whose .mo is missing or older, writing to a
+    temporary file first so a worker reading the catalog never sees a
+    partial file. Best effort: a catalog that can't be compiled (read-only
+    locale directory, syntax error) is logged and its current .mo kept.
+    Returns the paths of the compiled .mo files.
+    """
+    compiled = []
+    for po_path, mo_path in catalog_paths(languages):
+        try:
+            po_mtime = os.stat(po_path).st_mtime_ns
+        except OSError:
+            continue
+        try:
+            if os.stat(mo_path).st_mtime_ns >= po_mtime:
+                continue
+        except OSError:
+            pass
+        tmp_path = mo_path.with_name(f"{mo_path.name}.{os.getpid()}.tmp")
+        try:
+            polib.pofile(str(po_path)).save_as_mofile(str(tmp_path))
+            os.replace(tmp_path, mo_path)
+        except (OSError, ValueError):
+            logger.warning("Could not compile %s", po_path, exc_info=True)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            continue
+        compiled.append(mo_path)
+    return compiled
+
+
+def reload_catalogs():
+    """
+    Drop the catalogs loaded by this process. Each thread picks up the new
+    ones the next time a language is activated (LocaleMiddleware does it on
+    every request); unlike Django's autoreloader this leaves the languages
+    active in other threads alone.
+    """
+    gettext._translations.clear()
+    trans_real._translations = {}
+    trans_real._default = None
+
+
+def preload_catalogs():
+    """
+    Compile stale catalogs and load every language, so the first request of
+    a worker doesn't pay for reading them
+    """
+    compile_catalogs()
+    for code, _ in settings.LANGUAGES:
+        trans_real.translation(code)
+
+
+class CatalogWatcher:
+    """
+    Reload the catalogs when they change on disk, checking their
+    modification times at most once per ``interval`` seconds
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.version = catalog_version()
+        self._lock = threading.Lock()
+        self._next_check = time.monotonic() + interval
+
+    def check(self):
+        """Returns True if the catalogs were reloaded"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        with self._lock:
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.interval
+            version = catalog_version()
+            if version == self.version:
+                return False
+            self.version = version
+        reload_catalogs()
+        return True
@@ -0,0 +1,59 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+
+def state_dir():
+    return Path(getattr(settings, "AJEI_STATE_DIR", settings.BASE_DIR / "var"))
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def get_version(name):
+    """
+    Version of a piece of shared state (e.g. "constance"), as the
+    modification time in nanoseconds of its marker file in AJEI_STATE_DIR, or
+    0 if it was never bumped. Marker files make the version visible to every
+    worker process without touching the database.
+    """
+    return _mtime_ns(state_dir() / f"{name}.version")
+
+
+def bump_version(name):
+    """Mark a piece of shared state as changed"""
+    path = state_dir() / f"{name}.version"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+@lru_cache(maxsize=None)
+def _template_path(template_name):
+    # Resolved once: without the cached loader get_template() parses the file
+    return get_template(template_name).origin.name
+
+
+def template_version(template_name):
+    """Modification time of the template file"""
+    return _mtime_ns(_template_path(template_name))
+
+
+def catalog_version():
+    """Latest modification time of the translation catalogs"""
+    latest = 0
+    for locale_path in settings.LOCALE_PATHS:
+        for language, _ in settings.LANGUAGES:
+            messages = Path(locale_path) / language / "LC_MESSAGES"
+            latest = max(
+                latest,
+                _mtime_ns(messages / "django.mo"),
+                _mtime_ns(messages / "django.po"),
+            )
+    return latest
@@ -1,15 +1,36 @@
 from django.shortcuts import render, redirect
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.utils import translation
 from django.conf import settings
 from django.contrib import messages
-from django.views.decorators.http import require_POST
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.http import condition, require_POST, require_safe
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
-from django.db.models.functions import TruncDate, TruncHour
+from django.db.models import Max, Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from datetime import timedelta
+import hashlib
+import logging
 from constance import config
+from . import downloads, geoip
+from .bots import is_bot
+from .events import bus, event_stream
+from .dashboard import human_views, start_of_today, weighted_total
+from .funnel import landing_for, record_submission
+from .log import request_context
+from .metrics import CONTACT_SUBMISSIONS, DOWNLOADS, registry
 from .models import ContactSubmission, PageView
+from .page_cache import fragment_context, page_shell, page_version, personalize
+from .widgets import get_widgets
+
+logger = logging.getLogger(__name__)
 
 
 def get_client_ip(request):
@@ -22,6 +43,60 @@ def get_client_ip(request):
     return ip
 
 
+def landing_page_etag(request, template_name):
+    """
+    Strong ETag of a landing page, or None when the response must not be
+    reused because flash messages are waiting to be shown.
+
+    The page depends on the template, the language, the dynamic settings and
+    the translation catalogs. It also embeds a CSRF token, which stays valid
+    as long as the CSRF secret does not change, so the secret is part of the
+    tag too.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    parts = [
+        page_version(template_name),
+        # Set by CsrfViewMiddleware from the cookie, or by the render below
+        # when the visitor has no cookie yet
+        request.META.get("CSRF_COOKIE", ""),
+    ]
+    return quote_etag(hashlib.sha256("|".join(parts).encode()).hexdigest()[:32])
+
+
+def render_landing_page(request, template_name):
+    """
+    Render a landing page, or answer 304 Not Modified without rendering when
+    the visitor's cached copy is still valid.
+
+    The page is rendered once per language and settings version (see
+    ajei.page_cache) and the visitor's CSRF token and flash messages are
+    spliced into the cached copy.
+    """
+    etag = landing_page_etag(request, template_name)
+    if etag:
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+    # Get current language
+    current_lang = translation.get_language()
+
+    context = {
+        "config": config,
+        "current_language": current_lang,
+        **fragment_context(template_name),
+    }
+    shell = page_shell(request, template_name, context)
+    response = HttpResponse(personalize(request, shell))
+    if etag:
+        # Recomputed: the CSRF secret may have just been created
+        response["ETag"] = landing_page_etag(request, template_name)
+        # Per-visitor content (CSRF token): browsers only, always revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 def ajei_landing_page(request):
     """
     Main landing page view for Ajei project
@@ -46,14 +121,7 @@ def ajei_landing_page(request):
         )
         return response
 
-    # Get current language
-    current_lang = translation.get_language()
-
-    context = {
-        "config": config,
-        "current_language": current_lang,
-    }
-    return render(request, "landing_page/ajei_landing.html", context)
+    return render_landing_page(request, "landing_page/ajei_landing.html")
 
 
 def ajei_page(request):
@@ -80,14 +148,7 @@ def ajei_page(request):
         )
         return response
 
-    # Get current language
-    current_lang = translation.get_language()
-
-    context = {
-        "config": config,
-        "current_language": current_lang,
-    }
-    return render(request, "landing_page/ajei.html", context)
+    return render_landing_page(request, "landing_page/ajei.html")
 
 
 @require_POST
@@ -98,6 +159,7 @@ def ajei_contact_submit(request):
     try:
         # Check if contact form is enabled
         if not config.ENABLE_CONTACT_FORM:
+            CONTACT_SUBMISSIONS.inc(outcome="disabled")
             messages.warning(request, "نعتذر، نموذج الاتصال غير متاح حالياً.")
             return redirect("landing_page")
 
@@ -110,28 +172,41 @@ def ajei_contact_submit(request):
 
         # Basic validation
         if not all([name, email, phone]):
+            CONTACT_SUBMISSIONS.inc(outcome="invalid")
             messages.error(request, "يرجى ملء جميع الحقول المطلوبة.")
             return redirect("landing_page")
 
         # Create contact submission
+        ip_address = get_client_ip(request)
+        location = geoip.lookup(ip_address)
         contact = ContactSubmission.objects.create(
             name=name,
             email=email,
             phone=phone,
             message=message,
             investment_type=investment_type if investment_type else None,
-            ip_address=get_client_ip(request),
+            ip_address=ip_address,
+            country=location.country,
+            city=location.city,
             user_agent=request.META.get("HTTP_USER_AGENT", "")[:500],
             referrer=request.META.get("HTTP_REFERER", "")[:500],
+            **landing_for(request),
         )
+        record_submission(contact)
+
+        CONTACT_SUBMISSIONS.inc(outcome="created")
+        bus.contact_submitted()
 
         # Success message
         messages.success(request, "شكراً لتواصلك معنا! سنقوم بالرد عليك قريباً.")
         return redirect("landing_page")
 
-    except Exception as e:
+    except Exception:
+        CONTACT_SUBMISSIONS.inc(outcome="error")
         messages.error(request, "حدث خطأ في إرسال الرسالة. يرجى المحاولة مرة أخرى.")
-        print(f"Error saving contact submission: {e}")
+        logger.exception(
+            "Error saving contact submission", extra=request_context(request)
+        )
         return redirect("landing_page")
 
 
@@ -139,123 +214,95 @@ def ajei_contact_submit(request):
 def admin_dashboard(request):
     """
     Admin dashboard with statistics and management tools
-    """
-    # Date ranges
-    now = timezone.now()
-    today = now.date()
-    last_7_days = now - timedelta(days=7)
-    last_30_days = now - timedelta(days=30)
 
-    # Contact Submissions Stats
-    total_contacts = ContactSubmission.objects.count()
-    new_contacts = ContactSubmission.objects.filter(status="new").count()
-    contacts_today = ContactSubmission.objects.filter(created_at__date=today).count()
-    contacts_this_week = ContactSubmission.objects.filter(
-        created_at__gte=last_7_days
-    ).count()
-    contacts_this_month = ContactSubmission.objects.filter(
-        created_at__gte=last_30_days
-    ).count()
+    Each panel is a widget (see ajei.dashboard) cached on its own and
+    refreshed in the background, so a slow query doesn't hold up the page;
+    panels not computed yet are listed in ``pending_widgets``.
+    """
+    context, pending = get_widgets()
 
     # Recent contacts
-    recent_contacts = ContactSubmission.objects.select_related().order_by(
+    context["recent_contacts"] = ContactSubmission.objects.select_related().order_by(
         "-created_at"
     )[:10]
+    context["pending_widgets"] = pending
 
-    # Contact by status
-    contacts_by_status = (
-        ContactSubmission.objects.values("status")
-        .annotate(count=Count("id"))
-        .order_by("-count")
-    )
-
-    # Contact by investment type
-    contacts_by_type = (
-        ContactSubmission.objects.exclude(
-            Q(investment_type__isnull=True) | Q(investment_type="")
-        )
-        .values("investment_type")
-        .annotate(count=Count("id"))
-        .order_by("-count")
-    )
+    return render(request, "dashboard/admin_dashboard.html", context)
 
-    # Page Views Stats
-    total_views = PageView.objects.count()
-    views_today = PageView.objects.filter(viewed_at__date=today).count()
-    views_this_week = PageView.objects.filter(viewed_at__gte=last_7_days).count()
-    views_this_month = PageView.objects.filter(viewed_at__gte=last_30_days).count()
-
-    # Unique visitors (by IP)
-    unique_visitors_today = (
-        PageView.objects.filter(viewed_at__date=today)
-        .values("ip_address")
-        .distinct()
-        .count()
-    )
 
-    unique_visitors_week = (
-        PageView.objects.filter(viewed_at__gte=last_7_days)
-        .values("ip_address")
-        .distinct()
-        .count()
-    )
+def dashboard_stats_etag(request):
+    """
+    ETag of the dashboard counters: the latest page view and the latest
+    contact change, plus the current hour so the rolling windows (today,
+    last 7 / 30 days) move forward even without new data
+    """
+    latest_view = PageView.objects.aggregate(latest=Max("id"))["latest"]
+    latest_contact = ContactSubmission.objects.aggregate(latest=Max("updated_at"))[
+        "latest"
+    ]
+    hour = timezone.now().strftime("%Y%m%d%H")
+    return f"{latest_view}-{latest_contact.timestamp() if latest_contact else 0}-{hour}"
 
-    # Most viewed pages
-    popular_pages = (
-        PageView.objects.values("page_path")
-        .annotate(count=Count("id"))
-        .order_by("-count")[:10]
-    )
 
-    # Views by day (last 7 days)
-    views_by_day = (
-        PageView.objects.filter(viewed_at__gte=last_7_days)
-        .annotate(day=TruncDate("viewed_at"))
-        .values("day")
-        .annotate(count=Count("id"))
-        .order_by("day")
+@login_required
+@condition(etag_func=dashboard_stats_etag)
+def dashboard_stats(request):
+    """
+    Dashboard counters as JSON, polled by the dashboard to refresh the stat
+    cards (answers 304 Not Modified while nothing changed)
+    """
+    now = timezone.now()
+    today = start_of_today()
+    last_7_days = now - timedelta(days=7)
+    last_30_days = now - timedelta(days=30)
+    page_views = human_views()
+
+    return JsonResponse(
+        {
+            "total_views": weighted_total(page_views),
+            "views_today": weighted_total(page_views.filter(viewed_at__gte=today)),
+            "views_this_week": weighted_total(
+                page_views.filter(viewed_at__gte=last_7_days)
+            ),
+            "unique_visitors_week": page_views.filter(viewed_at__gte=last_7_days)
+            .values("ip_address")
+            .distinct()
+            .count(),
+            "total_contacts": ContactSubmission.objects.count(),
+            "new_contacts": ContactSubmission.objects.filter(status="new").count(),
+            "contacts_this_week": ContactSubmission.objects.filter(
+                created_at__gte=last_7_days
+            ).count(),
+            "contacts_this_month": ContactSubmission.objects.filter(
+                created_at__gte=last_30_days
+            ).count(),
+        }
     )
 
-    # Views by hour (last 24 hours)
-    last_24_hours = now - timedelta(hours=24)
-    views_by_hour = (
-        PageView.objects.filter(viewed_at__gte=last_24_hours)
-        .annotate(hour=TruncHour("viewed_at"))
-        .values("hour")
-        .annotate(count=Count("id"))
-        .order_by("hour")
-    )
 
-    # Language distribution
-    language_stats = (
-        PageView.objects.exclude(Q(language="") | Q(language__isnull=True))
-        .values("language")
-        .annotate(count=Count("id"))
-        .order_by("-count")
+@login_required
+async def dashboard_events(request):
+    """
+    Server-sent events with live dashboard counters from this worker's event
+    bus (ajei.events). Meant to be served by the ASGI application, where an
+    open stream costs no thread; subscribers share one snapshot per
+    AJEI_LIVE_EVENTS_INTERVAL seconds and never query the database.
+
+    Under WSGI the stream is refused with 204 No Content (which also stops
+    the browser from reconnecting): Django would collect the endless
+    generator in a worker thread before sending anything. The dashboard
+    then polls dashboard_stats instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(
+        event_stream(bus, getattr(settings, "AJEI_LIVE_EVENTS_INTERVAL", 1.0)),
+        content_type="text/event-stream",
     )
-
-    context = {
-        "total_contacts": total_contacts,
-        "new_contacts": new_contacts,
-        "contacts_today": contacts_today,
-        "contacts_this_week": contacts_this_week,
-        "contacts_this_month": contacts_this_month,
-        "recent_contacts": recent_contacts,
-        "contacts_by_status": contacts_by_status,
-        "contacts_by_type": contacts_by_type,
-        "total_views": total_views,
-        "views_today": views_today,
-        "views_this_week": views_this_week,
-        "views_this_month": views_this_month,
-        "unique_visitors_today": unique_visitors_today,
-        "unique_visitors_week": unique_visitors_week,
-        "popular_pages": popular_pages,
-        "views_by_day": views_by_day,
-        "views_by_hour": views_by_hour,
-        "language_stats": language_stats,
-    }
-
-    return render(request, "dashboard/admin_dashboard.html", context)
+    response["Cache-Control"] = "no-cache"
+    # Don't let nginx buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @login_required
@@ -380,3 +427,40 @@ def rosetta_pick_redirect(request, lang_code):
 
     messages.info(request, f"يرجى اختيار ملف الترجمة ({lang_code}) من قائمة Rosetta.")
     return redirect("/rosetta/")
+
+
+@require_safe
+def download(request, section, name):
+    """
+    Serve a file from AJEI_DOWNLOAD_DIRS (e.g. the portfolio PDF) with
+    Range/If-Range support, handing the transfer to the front-end server
+    when AJEI_SENDFILE_BACKEND is set, and count the downloads started by
+    people
+    """
+    response = downloads.serve(request, section, name)
+    if downloads.is_new_download(request, response) and not is_bot(
+        request.META.get("HTTP_USER_AGENT", "")
+    ):
+        DOWNLOADS.inc(file=f"{section}/{name}")
+        try:
+            downloads.record_download(section, name)
+        except Exception:
+            logger.exception("Error recording download", extra=request_context(request))
+    return response
+
+
+def metrics(request):
+    """
+    Prometheus metrics exposition, restricted to AJEI_METRICS_ALLOWED_IPS
+    and staff users
+    """
+    allowed_ips = getattr(settings, "AJEI_METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+    # The socket address, not X-Forwarded-For, which the client controls
+    if request.META.get("REMOTE_ADDR") not in allowed_ips and not (
+        request.user.is_authenticated and request.user.is_staff
+    ):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
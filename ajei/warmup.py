@@ -0,0 +1,76 @@
+import logging
+import os
+
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+
+from . import maintenance
+from .translations import preload_catalogs
+
+
+logger = logging.getLogger(__name__)
+
+
+def _cached_loaders(engine):
+    return [
+        loader
+        for loader in engine.engine.template_loaders
+        if isinstance(loader, CachedLoader)
+    ]
+
+
+def template_names(loader):
+    """Names of all templates the loaders wrapped by a cached loader can find"""
+    names = []
+    for inner in loader.loaders:
+        for directory in inner.get_dirs():
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    names.append(os.path.relpath(path, directory).replace(os.sep, "/"))
+    return list(dict.fromkeys(names))
+
+
+def warm_templates():
+    """
+    Compile every template into the cached template loaders, so the first
+    requests a worker serves don't pay for reading and parsing them.
+
+    Returns the number of compiled templates and the names of those that
+    failed to compile. Does nothing for engines without a cached loader
+    (AJEI_TEMPLATE_PROFILE = "development").
+    """
+    compiled, failed = 0, []
+    for engine in engines.all():
+        if not hasattr(engine, "engine"):
+            continue
+        for loader in _cached_loaders(engine):
+            for name in template_names(loader):
+                try:
+                    loader.get_template(name)
+                except Exception:
+                    failed.append(name)
+                else:
+                    compiled += 1
+    if failed:
+        logger.warning(
+            "%d templates failed to compile during warm-up",
+            len(failed),
+            extra={"templates": failed[:20]},
+        )
+    return compiled, failed
+
+
+def warm_up():
+    """
+    Prepare a worker process before it serves requests: compile the
+    templates, load the translation catalogs and line the maintenance flag
+    up with the MAINTENANCE_MODE setting. Called by config/wsgi.py and
+    config/asgi.py.
+    """
+    warm_templates()
+    preload_catalogs()
+    try:
+        maintenance.sync()
+    except OSError:
+        logger.warning("Could not write the maintenance pages", exc_info=True)
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .metrics import record_cache
+
+
+logger = logging.getLogger(__name__)
+
+# How long a refresh may hold its lock: a worker killed while computing
+# doesn't block the widget for longer than this
+LOCK_TIMEOUT = 300
+
+# name -> (function, ttl)
+_widgets = {}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def widget(name, ttl=None):
+    """
+    Register a dashboard widget: a function without arguments returning the
+    context entries of one panel (a picklable dict: evaluate the querysets).
+    It is cached for ``ttl`` seconds (default AJEI_DASHBOARD_WIDGET_TTL).
+    """
+
+    def register(function):
+        _widgets[name] = (function, ttl)
+        return function
+
+    return register
+
+
+def _cache_key(name):
+    return f"ajei:widget:{name}"
+
+
+def _lock_key(name):
+    return f"ajei:widget:{name}:lock"
+
+
+def _ttl(name):
+    ttl = _widgets[name][1]
+    return getattr(settings, "AJEI_DASHBOARD_WIDGET_TTL", 0) if ttl is None else ttl
+
+
+def _executor_for_process():
+    # Threads don't survive a fork: each worker process starts its own pool
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "AJEI_DASHBOARD_WORKERS", 4),
+                thread_name_prefix="ajei-widget",
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _refresh(name):
+    function, _ = _widgets[name]
+    stale_ttl = getattr(settings, "AJEI_DASHBOARD_WIDGET_STALE_TTL", 86400)
+    try:
+        cache.set(_cache_key(name), (time.time(), function()), _ttl(name) + stale_ttl)
+    except Exception:
+        logger.exception("Error computing the %s dashboard widget", name)
+        # Keep the lock for a while: a query that keeps failing or timing
+        # out is not run again on every dashboard load
+        cache.set(
+            _lock_key(name),
+            True,
+            getattr(settings, "AJEI_DASHBOARD_WIDGET_RETRY_AFTER", 60),
+        )
+    else:
+        cache.delete(_lock_key(name))
+    finally:
+        connections.close_all()
+
+
+def refresh(name):
+    """
+    Recompute a widget in the background, unless a refresh of it is already
+    running (the lock is taken with cache.add, so with a shared cache only
+    one process recomputes it)
+    """
+    if cache.add(_lock_key(name), True, LOCK_TIMEOUT):
+        _executor_for_process().submit(_refresh, name)
+
+
+def get_widgets(wait=None):
+    """
+    The context entries of every widget, and the names of the widgets that
+    aren't available yet.
+
+    Fresh widgets come from the cache. Stale ones (older than their TTL, up
+    to AJEI_DASHBOARD_WIDGET_STALE_TTL more) are served as they are while
+    one background refresh recomputes them. Missing ones are computed in the
+    background too, waiting at most ``wait`` seconds (default
+    AJEI_DASHBOARD_WIDGET_WAIT) for all of them together: the page never
+    waits for a slow query longer than that. With a TTL of 0 every widget is
+    computed during the request.
+    """
+    if not getattr(settings, "AJEI_DASHBOARD_WIDGET_TTL", 0):
+        context = {}
+        for function, _ in _widgets.values():
+            context.update(function())
+        return context, []
+
+    if wait is None:
+        wait = getattr(settings, "AJEI_DASHBOARD_WIDGET_WAIT", 2.0)
+    now = time.time()
+    context = {}
+    missing = []
+    cached = cache.get_many([_cache_key(name) for name in _widgets])
+    for name in _widgets:
+        entry = cached.get(_cache_key(name))
+        record_cache("widget", entry is not None)
+        if entry is None:
+            missing.append(name)
+            refresh(name)
+            continue
+        computed_at, values = entry
+        context.update(values)
+        if now - computed_at >= _ttl(name):
+            refresh(name)
+
+    deadline = time.monotonic() + wait
+    while missing and time.monotonic() < deadline:
+        time.sleep(0.05)
+        cached = cache.get_many([_cache_key(name) for name in missing])
+        for name in list(missing):
+            entry = cached.get(_cache_key(name))
+            if entry is not None:
+                context.update(entry[1])
+                missing.remove(name)
+    return context, missing
@@ -0,0 +1,16 @@
+"""
+Offline micro-benchmarks for the Ajei project.
+
+Run them from the project root, e.g. ``python -m benchmarks.bots``.
+"""
+
+import os
+
+
+def setup_django():
+    """Configure Django so the benchmarks can import the project code"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    import django
+
+    django.setup()
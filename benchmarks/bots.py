@@ -0,0 +1,76 @@
+"""
+Cost of the user-agent bot classifier used by PageViewTrackingMiddleware.
+
+Usage: python -m benchmarks.bots [--iterations N]
+"""
+
+import argparse
+import random
+import timeit
+
+from benchmarks import setup_django
+
+USER_AGENTS = [
+    # Browsers
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    # Bots
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)",
+    "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)",
+    "WhatsApp/2.23.20.0",
+    "Mozilla/5.0+(compatible; UptimeRobot/2.0; http://www.uptimerobot.com/)",
+    "curl/8.5.0",
+    "python-requests/2.32.3",
+    "",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test import RequestFactory
+    from django.http import HttpResponse
+    from ajei import bots
+    from ajei.middleware import PageViewTrackingMiddleware
+
+    n = args.iterations
+    stream = [random.choice(USER_AGENTS) for _ in range(1000)]
+
+    # Cold: every lookup misses the cache (unique suffix per call)
+    counter = iter(range(n))
+    cold = timeit.timeit(
+        lambda: bots.classify_user_agent(f"{stream[0]} {next(counter)}"), number=n
+    )
+
+    # Warm: realistic traffic, a small set of user agents seen over and over
+    bots.cache_clear()
+    warm = timeit.timeit(
+        lambda: [bots.classify_user_agent(ua) for ua in stream], number=n // 1000
+    )
+
+    # Full middleware path for a dropped bot request (no database access)
+    from django.test.utils import override_settings
+
+    factory = RequestFactory()
+    request = factory.get("/", HTTP_USER_AGENT=USER_AGENTS[5])
+    response = HttpResponse()
+    with override_settings(AJEI_BOT_TRACKING="drop"):
+        middleware = PageViewTrackingMiddleware(lambda r: response)
+    dropped = timeit.timeit(lambda: middleware(request), number=n)
+
+    print(f"classify (cache miss):  {cold / n * 1e6:8.3f} us/request")
+    print(f"classify (cache hit):   {warm / n * 1e6:8.3f} us/request")
+    print(f"middleware, bot dropped: {dropped / n * 1e6:7.3f} us/request")
+    print(f"cache: {bots.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare two benchmarks.latency JSON reports and flag regressions.
+
+Exits with status 1 if any endpoint/concurrency pair got slower than the
+threshold at p95, so it can gate a CI job.
+
+Usage: python -m benchmarks.compare baseline.json candidate.json [--threshold 0.2]
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report["meta"], {
+        (result["endpoint"], result["concurrency"]): result
+        for result in report["results"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative p95 slowdown considered a regression (default 20%%)",
+    )
+    args = parser.parse_args()
+
+    base_meta, baseline = load(args.baseline)
+    cand_meta, candidate = load(args.candidate)
+    print(f"baseline {base_meta.get('revision') or args.baseline}"
+          f" -> candidate {cand_meta.get('revision') or args.candidate}")
+    print(f"{'endpoint':<16}{'c':>4}{'p50 Δ':>10}{'p95 Δ':>10}{'p99 Δ':>10}{'rps Δ':>10}")
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+
+        def delta(field):
+            return (new[field] - old[field]) / old[field] if old[field] else 0.0
+
+        flag = ""
+        if delta("p95_ms") > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(
+            f"{key[0]:<16}{key[1]:>4}{delta('p50_ms'):>+10.1%}{delta('p95_ms'):>+10.1%}"
+            f"{delta('p99_ms'):>+10.1%}{delta('throughput_rps'):>+10.1%}{flag}"
+        )
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
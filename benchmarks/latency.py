@@ -0,0 +1,233 @@
+"""
+Latency and throughput benchmark for the public site and the dashboard.
+
+Runs entirely offline: a throwaway SQLite database is migrated and seeded,
+then each endpoint is exercised in-process through the Django test client at
+several concurrency levels. p50/p95/p99 latencies and throughput are written
+as JSON so runs can be compared between commits with benchmarks.compare.
+
+Usage: python -m benchmarks.latency [--requests N] [--concurrency 1 4 8]
+                                    [--output latency.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks import setup_django
+
+ENDPOINTS = [
+    # name, method, path, needs login, expected status
+    ("landing", "get", "/", False, 200),
+    ("ajei", "get", "/ajei/", False, 200),
+    ("contact_submit", "post", "/contact/submit/", False, 302),
+    ("dashboard", "get", "/dashboard/", True, 200),
+]
+
+BROWSER_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+)
+
+
+def configure_database(path):
+    """Point the default database at a throwaway SQLite file"""
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = path
+    # Concurrent writers wait for the lock instead of failing immediately
+    settings.DATABASES["default"].setdefault("OPTIONS", {})["timeout"] = 30
+
+
+def seed(page_views, contacts):
+    """Create the benchmark user and a realistic amount of data"""
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from ajei.models import ContactSubmission, PageView
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+    User.objects.create_superuser("bench", "bench@example.com", "bench")
+
+    rng = random.Random(42)
+    paths = ["/", "/", "/", "/ajei/", "/?lang=en", "/ajei/?lang=ar"]
+    PageView.objects.bulk_create(
+        (
+            PageView(
+                page_path=rng.choice(paths),
+                ip_address=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+                user_agent=BROWSER_UA,
+                session_key=f"{rng.getrandbits(128):032x}",
+                language=rng.choice(["ar", "ar", "en"]),
+            )
+            for _ in range(page_views)
+        ),
+        batch_size=1000,
+    )
+    ContactSubmission.objects.bulk_create(
+        (
+            ContactSubmission(
+                name=f"Investor {i}",
+                email=f"investor{i}@example.com",
+                phone=f"+2010{i:08d}",
+                investment_type=rng.choice(
+                    [choice for choice, _ in ContactSubmission.INVESTMENT_CHOICES]
+                ),
+                status=rng.choice(
+                    [choice for choice, _ in ContactSubmission.STATUS_CHOICES]
+                ),
+            )
+            for i in range(contacts)
+        ),
+        batch_size=1000,
+    )
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def run_endpoint(endpoint, concurrency, total_requests):
+    """Hit one endpoint total_requests times from concurrency threads"""
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+
+    name, method, path, needs_login, expected = endpoint
+    local = threading.local()
+    user = User.objects.get(username="bench") if needs_login else None
+    form = {
+        "name": "Benchmark",
+        "email": "bench@example.com",
+        "phone": "+201000000000",
+        "investment_type": "medical",
+        "message": "Benchmark submission",
+    }
+
+    def request_once(_):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = Client(HTTP_USER_AGENT=BROWSER_UA)
+            if user is not None:
+                client.force_login(user)
+        start = time.perf_counter()
+        if method == "post":
+            response = client.post(path, form)
+        else:
+            response = client.get(path)
+        elapsed = time.perf_counter() - start
+        return elapsed, response.status_code == expected
+
+    def close_connection(_):
+        connection.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Warm up every worker thread (client, session, template caches)
+        list(pool.map(request_once, range(concurrency * 2)))
+        started = time.perf_counter()
+        samples = list(pool.map(request_once, range(total_requests)))
+        wall = time.perf_counter() - started
+        list(pool.map(close_connection, range(concurrency)))
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+    return {
+        "endpoint": name,
+        "method": method.upper(),
+        "path": path,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": sum(1 for _, ok in samples if not ok),
+        "throughput_rps": round(total_requests / wall, 2),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--page-views", type=int, default=50_000)
+    parser.add_argument("--contacts", type=int, default=2_000)
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        choices=[endpoint[0] for endpoint in ENDPOINTS],
+        help="only run these endpoints",
+    )
+    parser.add_argument("--output", default="latency.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ajei-bench-") as tmp:
+        setup_django()
+        configure_database(os.path.join(tmp, "bench.sqlite3"))
+
+        import django
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        call_command("migrate", verbosity=0)
+        seed(args.page_views, args.contacts)
+
+        results = []
+        for endpoint in ENDPOINTS:
+            if args.endpoints and endpoint[0] not in args.endpoints:
+                continue
+            for concurrency in args.concurrency:
+                result = run_endpoint(endpoint, concurrency, args.requests)
+                results.append(result)
+                print(
+                    f"{result['endpoint']:<16} c={concurrency:<3} "
+                    f"p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms "
+                    f"p99={result['p99_ms']:>8.2f}ms {result['throughput_rps']:>8.1f} req/s "
+                    f"errors={result['errors']}"
+                )
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "django": django.get_version(),
+            "platform": platform.platform(),
+            "page_views": args.page_views,
+            "contacts": args.contacts,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Per-request overhead of PageViewTrackingMiddleware on untracked requests.
+
+Compares the compiled matcher against the previous implementation (a list
+rebuilt and scanned with startswith on every response) for excluded paths,
+non-GET requests and non-200 responses. No database access is involved.
+
+Usage: python -m benchmarks.middleware [--iterations N]
+"""
+
+import argparse
+import timeit
+
+from benchmarks import setup_django
+
+UNTRACKED_PATHS = [
+    "/static/css/custom.css",
+    "/media/upload.png",
+    "/admin/ajei/pageview/",
+    "/dashboard/contacts/",
+    "/rosetta/files/project/",
+    "/accounts/login/",
+]
+
+
+def legacy_is_excluded(path):
+    """Exclusion check as it was done before the matcher was compiled"""
+    skip_paths = [
+        "/admin/",
+        "/static/",
+        "/media/",
+        "/dashboard/",
+        "/rosetta/",
+        "/accounts/",
+    ]
+    return any(path.startswith(skip_path) for skip_path in skip_paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.http import HttpResponse, HttpResponseNotFound
+    from django.test import RequestFactory
+    from ajei.middleware import PageViewTrackingMiddleware
+
+    n = args.iterations
+    factory = RequestFactory()
+    ok = HttpResponse()
+    not_found = HttpResponseNotFound()
+
+    def overhead(request, response):
+        """Time spent in the middleware itself, per request, in microseconds"""
+        middleware = PageViewTrackingMiddleware(lambda r: response)
+        bare = timeit.timeit(lambda: (lambda r: response)(request), number=n)
+        wrapped = timeit.timeit(lambda: middleware(request), number=n)
+        return max(wrapped - bare, 0) / n * 1e6
+
+    print(f"{'case':<40}{'us/request':>12}")
+    for path in UNTRACKED_PATHS:
+        request = factory.get(path)
+        print(f"{'GET ' + path:<40}{overhead(request, ok):>12.3f}")
+
+    request = factory.post("/contact/submit/")
+    print(f"{'POST /contact/submit/':<40}{overhead(request, ok):>12.3f}")
+    request = factory.get("/missing/")
+    print(f"{'GET /missing/ (404)':<40}{overhead(request, not_found):>12.3f}")
+
+    legacy = timeit.timeit(
+        lambda: [legacy_is_excluded(p) for p in UNTRACKED_PATHS],
+        number=n // len(UNTRACKED_PATHS),
+    )
+    middleware = PageViewTrackingMiddleware(lambda r: ok)
+    compiled = timeit.timeit(
+        lambda: [middleware.is_excluded(p) for p in UNTRACKED_PATHS],
+        number=n // len(UNTRACKED_PATHS),
+    )
+    print()
+    print(f"{'exclusion check, legacy list':<40}{legacy / n * 1e6:>12.3f}")
+    print(f"{'exclusion check, compiled regex':<40}{compiled / n * 1e6:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Compile the templates and load the translations before the first request
+# instead of during it
+from ajei.warmup import warm_up  # noqa: E402
+
+warm_up()
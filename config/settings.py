@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,8 +45,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "ajei.middleware.MaintenanceModeMiddleware",
+    "ajei.middleware.RequestInstrumentationMiddleware",
+    "ajei.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "ajei.middleware.TranslationReloadMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -57,12 +62,24 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "config.urls"
 
+# Template profile: "production" keeps compiled templates in memory (cached
+# loader, warmed at worker boot); "development" reads and parses them again
+# on every render, so edits show up without a restart
+AJEI_TEMPLATE_PROFILE = os.environ.get("AJEI_TEMPLATE_PROFILE", "production")
+
+template_loaders = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if AJEI_TEMPLATE_PROFILE == "production":
+    template_loaders = [("django.template.loaders.cached.Loader", template_loaders)]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": template_loaders,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -88,6 +105,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Per-process memory cache; point it to Redis or Memcached to share cached
+# pages between worker processes.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ajei",
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -204,6 +234,158 @@ def rosetta_access_control(user):
 
 ROSETTA_ACCESS_CONTROL_FUNCTION = rosetta_access_control
 
+# Directory for marker files shared by all worker processes (e.g. the
+# version of the dynamic settings, used in the landing pages' ETags)
+AJEI_STATE_DIR = BASE_DIR / "var"
+
+# Landing pages are rendered once per language and settings version and
+# cached for this many seconds; the CSRF token and flash messages are spliced
+# in per request (0 disables the cache)
+AJEI_PAGE_CACHE_TIMEOUT = 3600
+
+# The static sections of the landing pages are also cached as template
+# fragments per language and template/catalog version, for this many seconds
+AJEI_FRAGMENT_CACHE_TIMEOUT = 86400
+
+# Workers reload the translation catalogs when the .po/.mo files change
+# (Rosetta saves), checking at most this often in seconds (None disables it)
+AJEI_TRANSLATION_CHECK_INTERVAL = 2.0
+
+# Maintenance mode (the MAINTENANCE_MODE dynamic setting or the maintenance
+# command): public pages answer 503 with a page pre-rendered per language,
+# without touching the database. Workers check the flag file in
+# AJEI_STATE_DIR at most this often in seconds (None disables it). The
+# exempt paths (AJEI_MAINTENANCE_EXEMPT_PATHS, by default /admin/,
+# /accounts/, /static/ and /metrics/: see ajei.middleware) keep working so
+# staff can sign in and switch it off.
+AJEI_MAINTENANCE_CHECK_INTERVAL = 1.0
+AJEI_MAINTENANCE_RETRY_AFTER = 600
+
+# Dashboard panels are cached for AJEI_DASHBOARD_WIDGET_TTL seconds (the
+# counters for a minute); after that the stale value is still served, for up
+# to AJEI_DASHBOARD_WIDGET_STALE_TTL more seconds, while one background thread
+# (of AJEI_DASHBOARD_WORKERS per process) recomputes it. On a cold cache the
+# page waits at most AJEI_DASHBOARD_WIDGET_WAIT seconds for the panels. A
+# panel whose computation failed is retried after
+# AJEI_DASHBOARD_WIDGET_RETRY_AFTER seconds. A TTL of 0 computes every panel
+# during the request.
+AJEI_DASHBOARD_WIDGET_TTL = 300
+AJEI_DASHBOARD_WIDGET_STALE_TTL = 86400
+AJEI_DASHBOARD_WIDGET_WAIT = 2.0
+AJEI_DASHBOARD_WIDGET_RETRY_AFTER = 60
+AJEI_DASHBOARD_WORKERS = 4
+
+# Live dashboard (server-sent events): how often streams check for new
+# counters, in seconds, and how long a visitor counts as active
+AJEI_LIVE_EVENTS_INTERVAL = 1.0
+AJEI_ACTIVE_VISITOR_WINDOW = 300
+
+# Files served by the download view (/download/<section>/<name>) with Range
+# support; downloads started are counted per day. With AJEI_SENDFILE_BACKEND
+# "nginx" (X-Accel-Redirect to AJEI_SENDFILE_URL_PREFIX + section/name, an
+# internal location aliased to the same directories) or "apache" (X-Sendfile)
+# the web server sends the bytes instead of the application.
+AJEI_DOWNLOAD_DIRS = {
+    "pdf": BASE_DIR / "static" / "pdf",
+    "images": BASE_DIR / "static" / "images",
+}
+AJEI_SENDFILE_BACKEND = None
+AJEI_SENDFILE_URL_PREFIX = "/protected/"
+
+# Page view tracking
+# What to do with page views from crawlers, uptime probes and link-preview
+# fetchers: "store" (keep them, tagged as bots), "sample" (keep only
+# AJEI_BOT_SAMPLE_RATE of them) or "drop" (never write them)
+AJEI_BOT_TRACKING = "sample"
+AJEI_BOT_SAMPLE_RATE = 0.1
+
+# Probabilistic sampling of page views under load: "off", "fixed" (keep
+# AJEI_PAGEVIEW_SAMPLE_RATE of them) or "adaptive" (aim for at most
+# AJEI_PAGEVIEW_TARGET_RPS writes per second per process). Each stored row
+# records its sample weight so the dashboard totals stay unbiased.
+AJEI_PAGEVIEW_SAMPLING = "off"
+AJEI_PAGEVIEW_SAMPLE_RATE = 1.0
+AJEI_PAGEVIEW_TARGET_RPS = 20
+AJEI_PAGEVIEW_SAMPLE_WINDOW = 5.0
+
+# Page views are written in batches by a background thread: when this many
+# are waiting, or at least every AJEI_PAGEVIEW_BUFFER_MAX_AGE seconds
+# (0 writes each view during its request). While writes fail, at most
+# AJEI_PAGEVIEW_BUFFER_MAX_ROWS views wait; more are dropped (and counted).
+AJEI_PAGEVIEW_BUFFER_SIZE = 100
+AJEI_PAGEVIEW_BUFFER_MAX_AGE = 2.0
+AJEI_PAGEVIEW_BUFFER_MAX_ROWS = 10000
+
+# A visitor's landing page and campaign are kept in a signed cookie for this
+# many seconds; views within that time are not counted as new visitors
+AJEI_LANDING_COOKIE_AGE = 1209600  # 2 weeks
+
+# Optional GeoIP enrichment of page views and contact submissions: path to a
+# local MaxMind DB file (e.g. GeoLite2-City.mmdb), read with the maxminddb
+# package. None disables it.
+AJEI_GEOIP_DATABASE = None
+
+# Data cleanup (manage.py cleanup, run from cron): expired sessions and page
+# views older than these many days (None keeps them: deleting page views is
+# opt-in) are deleted in batches of AJEI_CLEANUP_BATCH_SIZE rows, sleeping
+# AJEI_CLEANUP_PAUSE seconds in between. The daily rollups are kept: don't
+# rebuild them for pruned days.
+AJEI_BOT_PAGEVIEW_RETENTION_DAYS = None
+AJEI_PAGEVIEW_RETENTION_DAYS = None
+AJEI_CLEANUP_BATCH_SIZE = 500
+AJEI_CLEANUP_PAUSE = 0.1
+
+# Request instrumentation (query count, SQL, template and total time)
+# Fraction of requests to instrument; 0 disables the middleware entirely.
+# Instrumented requests get a Server-Timing header and are logged to the
+# "ajei.performance" logger when slower than AJEI_SLOW_REQUEST_MS.
+AJEI_INSTRUMENTATION_SAMPLE_RATE = 0.0
+AJEI_SLOW_REQUEST_MS = 500
+AJEI_SERVER_TIMING = True
+
+# Metrics exposed in the Prometheus text format at /metrics/ (localhost and
+# staff only). Set AJEI_METRICS_DIR to a directory shared by the worker
+# processes so the exposition aggregates all of them.
+AJEI_METRICS_ENABLED = True
+AJEI_METRICS_DIR = None
+AJEI_METRICS_FLUSH_INTERVAL = 5.0
+AJEI_METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+# Logging
+# Application records are written as JSON lines by a background thread
+# (ajei.log.BackgroundHandler), so request threads never block on log I/O.
+# Identical errors are logged at most once per minute; the next record
+# carries the number of suppressed duplicates. The 503s of maintenance mode
+# are left out of the django.request log.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "ajei.log.JSONFormatter"},
+    },
+    "filters": {
+        "rate_limit": {"()": "ajei.log.RateLimitFilter", "interval": 60},
+        "maintenance": {"()": "ajei.log.MaintenanceFilter"},
+    },
+    "handlers": {
+        "background": {
+            "class": "ajei.log.BackgroundHandler",
+            "formatter": "json",
+            "filters": ["rate_limit"],
+        },
+    },
+    "loggers": {
+        "ajei": {
+            "handlers": ["background"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "django.request": {
+            "filters": ["maintenance"],
+        },
+    },
+}
+
 # Authentication URLs
 LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/dashboard/"
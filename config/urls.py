@@ -26,6 +26,8 @@ urlpatterns = [
     path("ajei/", ajei_views.ajei_page, name="ajei_page"),
     path("contact/submit/", ajei_views.ajei_contact_submit, name="ajei_contact_submit"),
     path("dashboard/", ajei_views.admin_dashboard, name="admin_dashboard"),
+    path("dashboard/stats/", ajei_views.dashboard_stats, name="dashboard_stats"),
+    path("dashboard/events/", ajei_views.dashboard_events, name="dashboard_events"),
     path("dashboard/contacts/", ajei_views.contact_list, name="contact_list"),
     path(
         "dashboard/contact/<int:contact_id>/",
@@ -48,6 +50,12 @@ urlpatterns = [
         ajei_views.rosetta_pick_redirect,
         name="rosetta_pick_redirect",
     ),
+    path(
+        "download/<str:section>/<path:name>",
+        ajei_views.download,
+        name="download",
+    ),
+    path("metrics/", ajei_views.metrics, name="metrics"),
     path("admin/", admin.site.urls),
     path("accounts/", include("django.contrib.auth.urls")),
     path("rosetta/", include("rosetta.urls")),